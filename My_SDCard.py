@@ -1,5 +1,800 @@
-import machine, sdcard, uos
-from time import sleep
+import machine, sdcard, uos, ustruct
+from array import array
+from utime import ticks_ms, ticks_diff, ticks_add
+from micropython import const
+
+
+SECTOR_SIZE = const(512)
+
+# rekord pomiaru: czas[s], waga[mg], temperatura[0.1 C], wilgotność[0.1 %], flagi + 3 bajty wyrównania = 16 bajtów
+RECORD_FORMAT = "<IihHB3x"
+RECORD_SIZE = const(16)
+INDEX_FORMAT = "<II"            #wpis indeksu: czas[s], numer rekordu
+INDEX_SIZE = const(8)
+
+FLAG_NO_WEIGHT = const(0x01)
+FLAG_NO_TEMP = const(0x02)
+FLAG_NO_HUM = const(0x04)
+FLAG_TORN = const(0x80)         #rekord uzupełniony po zaniku zasilania w trakcie zapisu - do pominięcia
+
+TORN_MARK = b"!torn"            #znacznik dopisywany do przerwanej linii logu tekstowego
+
+CURSOR_FORMAT = "<IIII"         #punkt kontrolny kursora: generacja, pozycja w pliku, numer kolejny, suma kontrolna
+CURSOR_MAGIC = const(0x5A5AC3C3)
+
+
+def repair_tail(file_dir, record_size=0):
+    """
+    Funkcja sprawdzająca koniec pliku po zaniku zasilania (rozmiar pliku i najwyżej ostatni bajt).
+    *Pliki nie mogą być skracane (brak truncate w MicroPython) - przerwany wpis jest domykany:
+    *- log tekstowy: do przerwanej linii dopisywany jest TORN_MARK i znak nowej linii
+    *- rekordy binarne: niepełny rekord jest uzupełniany zerami i oznaczany flagą FLAG_TORN
+
+    :param file_dir: Ścieżka do pliku: string
+    :param record_size: Rozmiar rekordu binarnego, 0 - log tekstowy: int
+    :return: 'True' jeśli plik został naprawiony, w przeciwnym razie 'False': bool
+    """
+    try:
+        size = uos.stat(file_dir)[6]
+    except OSError:
+        return False
+    if(not size):
+        return False
+
+    if(record_size):
+        rest = size % record_size
+        if(not rest):
+            return False
+        pad = bytearray(record_size - rest)
+        if(rest <= RECORD_SIZE - 4):
+            pad[RECORD_SIZE - 4 - rest] = FLAG_TORN     #bajt flag nie został zapisany
+    else:
+        f = open(file_dir, "rb")
+        f.seek(size - 1)
+        last = f.read(1)
+        f.close()
+        if(last == b"\n"):
+            return False
+        pad = TORN_MARK + b"\n"
+
+    print("--Naprawa przerwanego wpisu: " + file_dir + "--")
+    f = open(file_dir, "ab")
+    f.write(pad)
+    f.close()
+    return True
+
+
+
+
+class My_log_writer():
+    """
+    Klasa buforująca zapis logów do pliku - plik pozostaje otwarty, dane trafiają na kartę całymi sektorami.
+    *Bufor jest zapisywany po zapełnieniu, po przekroczeniu wieku najstarszego wpisu lub przez flush()
+    *Przy zaniku zasilania tracone są co najwyżej dane z ostatnich 'max_age' sekund (maksymalnie 'buf_size' bajtów)
+    *Zapis po zapełnieniu kończy się na granicy sektora, reszta zostaje w buforze
+
+    Przykładowa procedura:
+    1. Inicjalizacja
+    2. Zapis logów (write)
+    3. Okresowe wywoływanie poll() - zapis po przekroczeniu wieku
+    4. Zamknięcie (close)
+    """
+
+    def __init__(self, file_dir, buf_size=1024, max_age=30, record_size=0):
+        """
+        :param file_dir: Ścieżka do pliku z logami: string
+        :param buf_size: Rozmiar bufora w bajtach (wielokrotność 512): int
+        :param max_age: Maksymalny czas[s] przechowywania wpisu w buforze: int
+        :param record_size: Rozmiar rekordu binarnego, 0 - log tekstowy (do naprawy końca pliku): int
+        """
+        self.file_dir = file_dir
+        self.max_age = max_age
+        repair_tail(file_dir, record_size)
+
+        buf_size = max(SECTOR_SIZE, buf_size - buf_size % SECTOR_SIZE)
+        self._buf = bytearray(buf_size)
+        self._mv = memoryview(self._buf)
+        self._len = 0
+        self._first_ms = None
+
+        self._file = open(file_dir, "ab")
+        try:
+            self._offset = uos.stat(file_dir)[6]       #pozycja w pliku - do wyrównania zapisu do sektorów
+        except OSError:
+            self._offset = 0
+
+
+    def write(self, text):
+        """
+        Funkcja dopisująca wpis do bufora (zapis na kartę po zapełnieniu bufora).
+
+        :param text: Treść wpisu: string or bytes
+        """
+        if(isinstance(text, str)):
+            text = text.encode("utf-8")
+        mv = memoryview(text)
+        while(len(mv)):
+            n = min(len(mv), len(self._buf) - self._len)
+            self._buf[self._len : self._len + n] = mv[:n]
+            self._len += n
+            mv = mv[n:]
+            if(self._first_ms is None):
+                self._first_ms = ticks_ms()
+            if(self._len == len(self._buf)):
+                self._write_sectors()
+
+
+    def _write_sectors(self):
+        """
+        Funkcja zapisująca z bufora dane kończące się na granicy sektora, reszta jest przesuwana na początek.
+        """
+        n = self._len - (self._offset + self._len) % SECTOR_SIZE
+        if(n <= 0):
+            n = self._len
+        self._file.write(self._mv[:n])
+        self._offset += n
+        rest = self._len - n
+        self._buf[:rest] = self._mv[n : self._len]
+        self._len = rest
+        if(not rest):
+            self._first_ms = None
+
+
+    def poll(self):
+        """
+        Funkcja do okresowego wywoływania - zapisuje bufor, jeśli najstarszy wpis przekroczył limit wieku.
+        """
+        if(self._first_ms is not None and ticks_diff(ticks_ms(), self._first_ms) >= self.max_age * 1000):
+            self.flush()
+
+
+    def flush(self):
+        """
+        Funkcja zapisująca cały bufor na kartę.
+        """
+        if(self._len):
+            self._file.write(self._mv[:self._len])
+            self._offset += self._len
+            self._len = 0
+        self._first_ms = None
+        self._file.flush()
+
+
+    def close(self):
+        """
+        Funkcja zapisująca bufor i zamykająca plik.
+        """
+        self.flush()
+        self._file.close()
+
+
+    def tell(self):
+        """
+        :return: Rozmiar pliku razem z danymi w buforze: int
+        """
+        return self._offset + self._len
+
+
+    def tell_written(self):
+        """
+        :return: Rozmiar pliku bez danych w buforze (dane przekazane do systemu plików): int
+        """
+        return self._offset
+
+
+
+class My_record_log():
+    """
+    Klasa zapisująca pomiary jako rekordy binarne stałej długości (RECORD_FORMAT, 16 bajtów).
+    *Co 'index_every' rekordów do pliku indeksu ('<plik>.idx') dopisywany jest wpis (czas, numer rekordu)
+    *Wpis indeksu trafia na kartę dopiero po zapisaniu rekordu, na który wskazuje (nie wyprzedza danych po zaniku
+     zasilania), przy otwarciu pliku wpisy wskazujące poza ostatni rekord są usuwane
+    *Wyszukiwanie po czasie - wyszukiwanie binarne w indeksie i przeskok (seek) zamiast czytania całego pliku
+    *Wymaga niemalejących znaczników czasu
+    *Dekodowanie do CSV na komputerze: records_to_csv.py
+
+    Przykładowa procedura:
+    1. Inicjalizacja
+    2. Zapis pomiarów (append)
+    3. Odczyt zakresu (read / read_since)
+    """
+
+    def __init__(self, file_dir, index_every=64, buf_size=1024, max_age=30):
+        """
+        :param file_dir: Ścieżka do pliku z rekordami: string
+        :param index_every: Co ile rekordów dopisywany jest wpis indeksu: int
+        :param buf_size: Rozmiar bufora zapisu w bajtach (wielokrotność 512): int
+        :param max_age: Maksymalny czas[s] przechowywania rekordu w buforze: int
+        """
+        self.file_dir = file_dir
+        self.index_dir = file_dir + ".idx"
+        self.index_every = index_every
+
+        self._record = bytearray(RECORD_SIZE)
+        self._writer = My_log_writer(file_dir, buf_size, max_age, RECORD_SIZE)
+        self._count = self._writer.tell() // RECORD_SIZE
+        self._index = []            #wpisy indeksu czekające na zapis rekordów
+        self._repair_index()
+
+
+    def __len__(self):
+        return self._count
+
+
+    def append(self, timestamp, weight_mg=None, temp=None, hum=None, flags=0):
+        """
+        Funkcja dopisująca rekord pomiaru.
+
+        :param timestamp: Czas pomiaru[s]: int
+        :param weight_mg: Waga w mg: int
+        :param temp: Temperatura[C]: int or float
+        :param hum: Wilgotność[%]: int or float
+        :param flags: Dodatkowe flagi: int
+        """
+        if(weight_mg is None):
+            flags |= FLAG_NO_WEIGHT
+        if(temp is None):
+            flags |= FLAG_NO_TEMP
+        if(hum is None):
+            flags |= FLAG_NO_HUM
+        ustruct.pack_into(RECORD_FORMAT, self._record, 0, timestamp, weight_mg or 0,
+                          int((temp or 0) * 10), int((hum or 0) * 10), flags)
+
+        if(self._count % self.index_every == 0):
+            self._index.append((timestamp, self._count))
+        self._writer.write(self._record)
+        self._count += 1
+        self._write_index()
+
+
+    def poll(self):
+        """Funkcja do okresowego wywoływania - zapisuje bufor po przekroczeniu limitu wieku"""
+        self._writer.poll()
+        self._write_index()
+
+
+    def flush(self):
+        """Funkcja zapisująca bufor na kartę"""
+        self._writer.flush()
+        self._write_index()
+
+
+    def close(self):
+        """Funkcja zapisująca bufor i zamykająca plik"""
+        self._writer.flush()
+        self._write_index()
+        self._writer.close()
+
+
+    def _write_index(self):
+        """
+        Funkcja dopisująca do pliku indeksu wpisy rekordów, które zostały już zapisane z bufora.
+        """
+        written = self._writer.tell_written() // RECORD_SIZE
+        if(not self._index or self._index[0][1] >= written):
+            return
+        self._writer._file.flush()          #rekordy muszą być na karcie przed wpisem indeksu
+        f = open(self.index_dir, "ab")
+        while(self._index and self._index[0][1] < written):
+            f.write(ustruct.pack(INDEX_FORMAT, *self._index.pop(0)))
+        f.close()
+
+
+    def _repair_index(self):
+        """
+        Funkcja usuwająca z końca pliku indeksu wpisy wskazujące poza ostatni rekord (np. po zaniku zasilania).
+        """
+        try:
+            entries = uos.stat(self.index_dir)[6] // INDEX_SIZE
+        except OSError:
+            return
+        f = open(self.index_dir, "rb")
+        valid = entries
+        while(valid > 0):
+            f.seek((valid - 1) * INDEX_SIZE)
+            if(ustruct.unpack(INDEX_FORMAT, f.read(INDEX_SIZE))[1] < self._count):
+                break
+            valid -= 1
+        if(valid == entries):
+            f.close()
+            return
+
+        print("--Naprawa indeksu: " + self.index_dir + "--")
+        # przepisanie poprawnych wpisów do nowego pliku (brak truncate w MicroPython)
+        tmp_dir = self.index_dir + ".tmp"
+        tmp = open(tmp_dir, "wb")
+        f.seek(0)
+        buf = bytearray(SECTOR_SIZE)
+        left = valid * INDEX_SIZE
+        while(left):
+            n = min(f.readinto(buf), left)
+            if(not n):
+                break
+            tmp.write(buf[:n])
+            left -= n
+        tmp.close()
+        f.close()
+        uos.remove(self.index_dir)
+        uos.rename(tmp_dir, self.index_dir)
+
+
+    def find(self, timestamp):
+        """
+        Funkcja wyszukująca pierwszy rekord z czasem >= 'timestamp'.
+
+        :param timestamp: Czas[s]: int
+        :return: Numer rekordu (len() jeśli brak takiego rekordu): int
+        """
+        start = 0
+        try:
+            f = open(self.index_dir, "rb")
+        except OSError:
+            f = None
+        if(f):
+            # wyszukiwanie binarne ostatniego wpisu indeksu z czasem < 'timestamp'
+            low = 0
+            high = uos.stat(self.index_dir)[6] // INDEX_SIZE - 1
+            while(low <= high):
+                middle = (low + high) // 2
+                f.seek(middle * INDEX_SIZE)
+                entry_time, entry_record = ustruct.unpack(INDEX_FORMAT, f.read(INDEX_SIZE))
+                if(entry_time < timestamp):
+                    start = entry_record
+                    low = middle + 1
+                else:
+                    high = middle - 1
+            f.close()
+
+        for record_no, record in self.read(start):
+            if(record[0] >= timestamp):
+                return record_no
+        return self._count
+
+
+    def read(self, start=0, count=None):
+        """
+        Generator odczytujący rekordy od podanego numeru (przerwane rekordy - FLAG_TORN - są pomijane).
+
+        :param start: Numer pierwszego rekordu: int
+        :param count: Maksymalna liczba rekordów, domyślnie do końca pliku: int
+        :return: Kolejne (numer rekordu, (czas, waga[mg], temperatura[0.1 C], wilgotność[0.1 %], flagi)): tuple
+        """
+        self.flush()
+        end = self._count if count is None else min(self._count, start + count)
+        buf = bytearray(RECORD_SIZE)
+        f = open(self.file_dir, "rb")
+        try:
+            f.seek(start * RECORD_SIZE)
+            for record_no in range(start, end):
+                if(f.readinto(buf) != RECORD_SIZE):
+                    break
+                record = ustruct.unpack(RECORD_FORMAT, buf)
+                if(not record[4] & FLAG_TORN):
+                    yield record_no, record
+        finally:
+            f.close()
+
+
+    def read_since(self, timestamp, count=None):
+        """
+        Generator odczytujący rekordy z czasem >= 'timestamp'.
+
+        :param timestamp: Czas[s]: int
+        :param count: Maksymalna liczba rekordów: int
+        :return: Kolejne (numer rekordu, rekord): tuple
+        """
+        return self.read(self.find(timestamp), count)
+
+
+
+class My_upload_cursor():
+    """
+    Klasa zapamiętująca, które wpisy pliku (log tekstowy lub rekordy binarne) zostały już wysłane.
+    *Kursor: pozycja w pliku i numer kolejny wpisu - wznowienie po restarcie bez przeszukiwania pliku
+    *Punkty kontrolne zapisywane naprzemiennie w dwóch sektorach pliku '<plik>.cur' z sumą kontrolną -
+    *przerwany zapis uszkadza tylko jedną kopię, odczytywana jest najnowsza poprawna
+    *Przerwane wpisy (repair_tail) są pomijane
+
+    Przykładowa procedura:
+    1. Inicjalizacja (odczyt punktu kontrolnego)
+    2. Odczyt nowych wpisów (read)
+    3. Wysłanie wpisów
+    4. Zatwierdzenie (commit)
+    """
+
+    def __init__(self, file_dir, record_size=0, cursor_dir=None, source=None):
+        """
+        :param file_dir: Ścieżka do pliku z wpisami: string
+        :param record_size: Rozmiar rekordu binarnego, 0 - log tekstowy: int
+        :param cursor_dir: Ścieżka do pliku kursora, domyślnie '<plik>.cur': string
+        :param source: Opcjonalny obiekt z metodą flush() zapisujący bufor pliku przed odczytem: object
+        """
+        self.file_dir = file_dir
+        self.record_size = record_size
+        self.cursor_dir = cursor_dir or file_dir + ".cur"
+        self.source = source
+
+        self.offset = 0             #pozycja pierwszego niewysłanego wpisu
+        self.seq = 0                #liczba wysłanych wpisów
+        self._gen = 0
+        self._slot = bytearray(ustruct.calcsize(CURSOR_FORMAT))
+        self._load()
+
+
+    def _check(self, gen, offset, seq):
+        return (gen ^ offset ^ seq ^ CURSOR_MAGIC) & 0xFFFFFFFF
+
+
+    def _load(self):
+        """
+        Funkcja odczytująca najnowszy poprawny punkt kontrolny.
+        """
+        try:
+            f = open(self.cursor_dir, "rb")
+        except OSError:
+            return
+        for slot in range(2):
+            f.seek(slot * SECTOR_SIZE)
+            if(f.readinto(self._slot) != len(self._slot)):
+                continue
+            gen, offset, seq, check = ustruct.unpack(CURSOR_FORMAT, self._slot)
+            if(check == self._check(gen, offset, seq) and gen >= self._gen):
+                self._gen, self.offset, self.seq = gen, offset, seq
+        f.close()
+
+        try:
+            size = uos.stat(self.file_dir)[6]
+        except OSError:
+            size = 0
+        if(self.offset > size):
+            print("--Plik " + self.file_dir + " jest krotszy niz kursor, wysylanie od poczatku--")
+            self.offset = 0
+
+
+    def _save(self):
+        """
+        Funkcja zapisująca punkt kontrolny do starszej z dwóch kopii.
+        """
+        self._gen += 1
+        ustruct.pack_into(CURSOR_FORMAT, self._slot, 0, self._gen, self.offset, self.seq,
+                          self._check(self._gen, self.offset, self.seq))
+        try:
+            f = open(self.cursor_dir, "r+b")
+        except OSError:
+            f = open(self.cursor_dir, "wb")
+            f.write(bytearray(2 * SECTOR_SIZE))
+        f.seek((self._gen % 2) * SECTOR_SIZE)
+        f.write(self._slot)
+        f.close()
+
+
+    def read(self, max_count=20):
+        """
+        Funkcja odczytująca kolejne niewysłane wpisy (tylko kompletne, bez przerwanych).
+
+        :param max_count: Maksymalna liczba wpisów: int
+        :return: (wpisy, pozycja za ostatnim wpisem) - linie (string) lub rekordy (tuple): tuple
+        """
+        if(self.source):
+            self.source.flush()
+        items = []
+        try:
+            f = open(self.file_dir, "rb")
+        except OSError:
+            return items, self.offset
+
+        offset = self.offset
+        f.seek(offset)
+        if(self.record_size):
+            buf = bytearray(self.record_size)
+            while(len(items) < max_count and f.readinto(buf) == self.record_size):
+                offset += self.record_size
+                record = ustruct.unpack(RECORD_FORMAT, buf)
+                if(not record[4] & FLAG_TORN):
+                    items.append(record)
+        else:
+            while(len(items) < max_count):
+                line = f.readline()
+                if(not line.endswith(b"\n")):
+                    break           #koniec pliku lub linia w trakcie zapisu
+                offset += len(line)
+                line = line.rstrip(b"\r\n")
+                if(line and not line.endswith(TORN_MARK)):
+                    items.append(line.decode("utf-8"))
+        f.close()
+        return items, offset
+
+
+    def commit(self, offset, count):
+        """
+        Funkcja zatwierdzająca wysłanie wpisów odczytanych przez read().
+
+        :param offset: Pozycja za ostatnim wysłanym wpisem (z read()): int
+        :param count: Liczba wysłanych wpisów: int
+        """
+        self.offset = offset
+        self.seq += count
+        self._save()
+
+
+
+class My_block_cache():
+    """
+    Klasa pamięci podręcznej sektorów (LRU) pośrednicząca między systemem plików a kartą SD.
+    *FAT wielokrotnie czyta te same sektory tablicy FAT i katalogów - trafienia nie wymagają transmisji SPI
+    *Tryb write-through (domyślny) - zapis od razu na kartę; tryb write-back - zapis przy usunięciu z pamięci lub sync()
+    *Przypięte sektory (np. sektor rozruchowy, początek tablicy FAT) nie są usuwane z pamięci
+    *Odczyty wielu sektorów naraz (dane plików) omijają pamięć podręczną - nie wypierają metadanych
+    *Zlicza trafienia, chybienia i zapisy (get_stats)
+
+    Przykład:
+    cache = My_block_cache(sdcard.SDCard(spi, cs), 8192)
+    uos.mount(cache, "/sd")
+    """
+
+    def __init__(self, device, budget=4096, write_back=False):
+        """
+        :param device: Urządzenie blokowe (sdcard.SDCard): object
+        :param budget: Rozmiar pamięci podręcznej w bajtach (wielokrotność 512): int
+        :param write_back: 'True' - zapis opóźniony, 'False' - zapis natychmiastowy: bool
+        """
+        self.device = device
+        self.write_back = write_back
+
+        slots = max(1, budget // SECTOR_SIZE)
+        self._data = bytearray(slots * SECTOR_SIZE)
+        self._mv = memoryview(self._data)
+        self._blocks = array("l", [-1] * slots)      #numer sektora w danym miejscu, -1 - wolne
+        self._used = array("L", [0] * slots)         #licznik ostatniego użycia (LRU)
+        self._dirty = bytearray(slots)
+        self._pinned = bytearray(slots)
+        self._clock = 0
+        self._tmp = bytearray(SECTOR_SIZE)
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0             #zapisy sektorów na kartę
+        self.evictions = 0
+
+
+    def _find(self, block_num):
+        """
+        :return: Indeks miejsca z sektorem lub -1 jeśli go nie ma: int
+        """
+        blocks = self._blocks
+        for i in range(len(blocks)):
+            if(blocks[i] == block_num):
+                return i
+        return -1
+
+
+    def _slot(self, i):
+        return self._mv[i * SECTOR_SIZE : (i + 1) * SECTOR_SIZE]
+
+
+    def _touch(self, i):
+        self._clock += 1
+        self._used[i] = self._clock
+
+
+    def _evict(self):
+        """
+        Funkcja zwalniająca najdawniej używane (nieprzypięte) miejsce, sektor zmieniony jest zapisywany na kartę.
+
+        :return: Indeks wolnego miejsca lub -1 jeśli wszystkie są przypięte: int
+        """
+        victim = -1
+        for i in range(len(self._blocks)):
+            if(self._blocks[i] == -1):
+                return i
+            if(not self._pinned[i] and (victim < 0 or self._used[i] < self._used[victim])):
+                victim = i
+        if(victim >= 0):
+            self._write_slot(victim)
+            self._blocks[victim] = -1
+            self.evictions += 1
+        return victim
+
+
+    def _write_slot(self, i):
+        """
+        Funkcja zapisująca zmieniony sektor na kartę.
+        """
+        if(self._dirty[i]):
+            self.device.writeblocks(self._blocks[i], self._slot(i))
+            self._dirty[i] = 0
+            self.writes += 1
+
+
+    def _load(self, block_num):
+        """
+        Funkcja wczytująca sektor do pamięci podręcznej.
+
+        :return: Indeks miejsca lub -1 jeśli nie ma wolnego miejsca: int
+        """
+        i = self._evict()
+        if(i >= 0):
+            self.device.readblocks(block_num, self._slot(i))
+            self._blocks[i] = block_num
+            self._touch(i)
+        return i
+
+
+    def _partial(self, block_num, buf, offset, write):
+        """
+        Funkcja obsługująca odczyt / zapis fragmentu sektora (rozszerzony protokół urządzenia blokowego, VfsLfs2).
+        """
+        block_num += offset // SECTOR_SIZE
+        offset %= SECTOR_SIZE
+        mv = memoryview(buf)
+        tmp = self._tmp
+        pos = 0
+        while(pos < len(buf)):
+            n = min(SECTOR_SIZE - offset, len(buf) - pos)
+            if(n < SECTOR_SIZE or not write):
+                self.readblocks(block_num, tmp)
+            if(write):
+                tmp[offset : offset + n] = mv[pos : pos + n]
+                self.writeblocks(block_num, tmp)
+            else:
+                mv[pos : pos + n] = tmp[offset : offset + n]
+            pos += n
+            block_num += 1
+            offset = 0
+
+
+    def readblocks(self, block_num, buf, offset=0):
+        if(offset or len(buf) % SECTOR_SIZE):
+            self._partial(block_num, buf, offset, False)
+            return
+        nblocks = len(buf) // SECTOR_SIZE
+        mv = memoryview(buf)
+        if(nblocks > 1):
+            # odczyt ciągły jednym poleceniem, nadpisanie sektorów zmienionych w pamięci podręcznej
+            self.device.readblocks(block_num, buf)
+            self.misses += nblocks
+            if(self.write_back):
+                for n in range(nblocks):
+                    i = self._find(block_num + n)
+                    if(i >= 0 and self._dirty[i]):
+                        mv[n * SECTOR_SIZE : (n + 1) * SECTOR_SIZE] = self._slot(i)
+            return
+
+        i = self._find(block_num)
+        if(i >= 0):
+            self.hits += 1
+            self._touch(i)
+            mv[:] = self._slot(i)
+            return
+        self.misses += 1
+        i = self._load(block_num)
+        if(i < 0):
+            self.device.readblocks(block_num, buf)
+        else:
+            mv[:] = self._slot(i)
+
+
+    def writeblocks(self, block_num, buf, offset=0):
+        if(offset or len(buf) % SECTOR_SIZE):
+            self._partial(block_num, buf, offset, True)
+            return
+        nblocks = len(buf) // SECTOR_SIZE
+        mv = memoryview(buf)
+        if(nblocks > 1 or not self.write_back):
+            self.device.writeblocks(block_num, buf)
+            self.writes += nblocks
+            # aktualizacja kopii w pamięci podręcznej
+            for n in range(nblocks):
+                i = self._find(block_num + n)
+                if(i < 0 and nblocks == 1):
+                    i = self._evict()
+                    if(i >= 0):
+                        self._blocks[i] = block_num
+                if(i >= 0):
+                    self._slot(i)[:] = mv[n * SECTOR_SIZE : (n + 1) * SECTOR_SIZE]
+                    self._dirty[i] = 0
+                    self._touch(i)
+            return
+
+        i = self._find(block_num)
+        if(i < 0):
+            i = self._evict()
+            if(i < 0):
+                self.device.writeblocks(block_num, buf)
+                self.writes += 1
+                return
+            self._blocks[i] = block_num
+        self._slot(i)[:] = mv
+        self._dirty[i] = 1
+        self._touch(i)
+
+
+    def ioctl(self, op, arg):
+        # inicjalizacja (op 1) nie czyści pamięci - system plików wywołuje ją przy montowaniu,
+        # już po przypięciu metadanych; pamięć jest czyszczona przy ponownym podłączeniu karty (_connect)
+        if(op == 3):          #synchronizacja
+            self.sync()
+        elif(op == 6):          #kasowanie sektora - kopia w pamięci jest nieaktualna
+            i = self._find(arg)
+            if(i >= 0):
+                self._blocks[i] = -1
+                self._dirty[i] = 0
+                self._pinned[i] = 0
+        return self.device.ioctl(op, arg)
+
+
+    def sync(self):
+        """
+        Funkcja zapisująca na kartę wszystkie zmienione sektory (write-back).
+        """
+        for i in range(len(self._blocks)):
+            if(self._blocks[i] != -1):
+                self._write_slot(i)
+
+
+    def clear(self):
+        """
+        Funkcja czyszcząca pamięć podręczną bez zapisu (np. po wyjęciu karty).
+        """
+        for i in range(len(self._blocks)):
+            self._blocks[i] = -1
+            self._dirty[i] = 0
+            self._pinned[i] = 0
+
+
+    def pin(self, block_num):
+        """
+        Funkcja przypinająca sektor (nie będzie usuwany z pamięci podręcznej).
+        *Przypiętych może być najwyżej połowa miejsc
+
+        :param block_num: Numer sektora: int
+        :return: 'True' jeśli się udało, w przeciwnym razie 'False': bool
+        """
+        if(sum(self._pinned) >= max(1, len(self._blocks) // 2)):
+            return False
+        i = self._find(block_num)
+        if(i < 0):
+            i = self._load(block_num)
+            if(i < 0):
+                return False
+        self._pinned[i] = 1
+        return True
+
+
+    def pin_metadata(self, count=2, lfs=False):
+        """
+        Funkcja przypinająca sektor rozruchowy FAT i pierwsze sektory tablicy FAT.
+        *Dla littlefs przypinane są bloki 0 i 1 (para superbloków) - pola FAT/MBR nie są odczytywane
+
+        :param count: Liczba sektorów tablicy FAT do przypięcia: int
+        :param lfs: System plików littlefs zamiast FAT: bool
+        """
+        if(lfs):
+            self.pin(0)
+            self.pin(1)
+            return
+        buf = bytearray(SECTOR_SIZE)
+        self.device.readblocks(0, buf)
+        start = 0
+        if(buf[0] not in (0xEB, 0xE9)):
+            # MBR - początek pierwszej partycji
+            start = ustruct.unpack_from("<I", buf, 0x1C6)[0]
+        self.pin(start)
+        i = self._find(start)
+        if(i < 0):
+            return
+        reserved = ustruct.unpack_from("<H", self._slot(i), 0x0E)[0]
+        for n in range(count):
+            self.pin(start + reserved + n)
+
+
+    def get_stats(self):
+        """
+        :return: Liczba trafień, chybień, zapisów sektorów na kartę i usunięć z pamięci: dictionary
+        """
+        return {"hits": self.hits, "misses": self.misses, "writes": self.writes, "evictions": self.evictions}
+
+
 
 class My_SDCard():
     """
@@ -9,46 +804,74 @@ class My_SDCard():
     *Możliwość zbierania danych w postaci logów na karcie SD.
     *Domyślna ścieżka do karty: "/sd"
     *Domyślna ścieżka do pliku z logami: "/sd/log.txt"
-    *Blokuje program do momentu podłączenia karty SD (na etapie inicjalizacji)
+    *Nie blokuje programu - karta jest podłączana w tle (poll()), kolejne próby z rosnącym odstępem
+    *Logi zapisane przed podłączeniem karty (lub po jej wyjęciu) trafiają do kolejki w RAM i są zapisywane po podłączeniu
     **Wymaga modułu 'sdcard.py' (MIT) - https://github.com/micropython/micropython/blob/master/drivers/sdcard/sdcard.py
     **Autor: Paweł Zięba 15.04.2021
 
     Przykładowa procedura:
     1. Inicjalizacja
-    2. Podłączneie karty SD do systemu plików (automatycznie przy inicjalizacji)
+    2. Podłączneie karty SD do systemu plików (pierwsza próba przy inicjalizacji, kolejne w poll())
     3. Zapisanie logu do pliku na karcie
+    4. Okresowe wywoływanie poll()
+    *Opcjonalnie buforowany zapis logów (enable_buffering)
     """
 
-    def __init__(self, spi, cs_pin, mount_dir="/sd", log_dir="/sd/log.txt"):
+    RETRY_MIN_MS = const(1000)
+    RETRY_MAX_MS = const(60000)
+
+    def __init__(self, spi, cs_pin, mount_dir="/sd", log_dir="/sd/log.txt", max_pending=50, cache_size=0,
+                 write_back=False, lfs=False):
         """
         :param spi: Objekt spi (machine.SPI(1)): object
         :param cs_pin: Numer pinu GPIO, do którego podłączony jest pin CS: int
         :param mount_dir: Opcjonalna ścieżka w systemie plików, do której ma zostać przypisana karta SD: string
         :param log_dir: Opcjonalna ścieżka do pliku z logami: string
+        :param max_pending: Maksymalna liczba logów w kolejce RAM (bez karty najstarsze są usuwane): int
+        :param cache_size: Rozmiar pamięci podręcznej sektorów w bajtach, 0 - bez pamięci podręcznej: int
+        :param write_back: Opóźniony zapis sektorów (zapis przy flush()): bool
+        :param lfs: System plików littlefs (uos.VfsLfs2) zamiast FAT - karta musi być wcześniej sformatowana
+                    (uos.VfsLfs2.mkfs): bool
         """
         self.spi = spi
         self.cs_pin = cs_pin
         self.log_dir = log_dir
         self.mount_dir = mount_dir
+        self.log_writer = None
+        self.records = None
+        self._buffering = None      #ustawienia My_log_writer - plik otwierany po podłączeniu karty
+        self._records_cfg = None    #ustawienia My_record_log
 
-        self.sd = sdcard.SDCard(self.spi, machine.Pin(self.cs_pin))
+        self.lfs = lfs
+        self.mounted = False
+        self.pending = []           #logi oczekujące na kartę: (ścieżka, treść) lub (None, rekord)
+        self.max_pending = max_pending
+        self.dropped = 0            #logi usunięte z pełnej kolejki
+        self._retry_ms = self.RETRY_MIN_MS
+        self._next_try_ms = ticks_ms()
 
-        while(not self._connect()):
-            print("Laczenie z karta SD..")
-            self._connect()
-            sleep(1)
+        self.sd = sdcard.SDCard(self.spi, machine.Pin(self.cs_pin))
+        self.cache = My_block_cache(self.sd, cache_size, write_back) if cache_size else None
+        self._try_mount()
 
 
     def _connect(self):
         """
-        Funkacja inicjalizująca i podłączająca kartę SD do systemu plików ESP
+        Funkacja inicjalizująca i podłączająca kartę SD do systemu plików ESP (jedna próba)
 
         :return: Status powodzenia, 'True' jeśli się uda połączyć, w przeciwnym razie 'False': bool
         """
         try:
             self.sd.init_card()
+            device = self.sd
+            if(self.cache):
+                self.cache.clear()
+                self.cache.pin_metadata(lfs=self.lfs)
+                device = self.cache
+            if(self.lfs):
+                device = uos.VfsLfs2(device)
             # przypisanie karty SD do systemu plików ESP
-            uos.mount(self.sd, self.mount_dir)
+            uos.mount(device, self.mount_dir)
 
             print("/: ")
             print(uos.listdir('/'))
@@ -61,6 +884,144 @@ class My_SDCard():
             return False
 
 
+    def _try_mount(self):
+        """
+        Funkcja podejmująca próbę podłączenia karty - po sukcesie otwiera pliki i zapisuje kolejkę,
+        po porażce wyznacza czas kolejnej próby (odstęp podwajany do RETRY_MAX_MS).
+        """
+        if(self._connect()):
+            self.mounted = True
+            self._retry_ms = self.RETRY_MIN_MS
+            self._open_files()
+            self._replay()
+        else:
+            print("--Kolejna proba polaczenia z karta SD za %d s--" % (self._retry_ms // 1000))
+            self._next_try_ms = ticks_add(ticks_ms(), self._retry_ms)
+            self._retry_ms = min(self._retry_ms * 2, self.RETRY_MAX_MS)
+
+
+    def _open_files(self):
+        """
+        Funkcja otwierająca pliki buforowanych logów i rekordów (jeśli włączone).
+        """
+        try:
+            if(self._buffering):
+                self.log_writer = My_log_writer(self.log_dir, *self._buffering)
+            else:
+                repair_tail(self.log_dir)
+            if(self._records_cfg):
+                self.records = My_record_log(*self._records_cfg)
+        except Exception as e:
+            print(e)
+            print("Blad otwarcia pliku z logami")
+
+
+    def _lost(self):
+        """
+        Funkcja sprawdzająca po błędzie zapisu, czy karta jest dostępna - jeśli nie, odłącza ją i planuje ponowne podłączenie.
+
+        :return: 'True' jeśli karta została utracona, w przeciwnym razie 'False': bool
+        """
+        try:
+            uos.statvfs(self.mount_dir)
+            self.sd.readblocks(0, bytearray(SECTOR_SIZE))
+            return False
+        except Exception:
+            pass
+
+        print("--Utracono polaczenie z karta SD--")
+        self.mounted = False
+        self.log_writer = None      #pliki na utraconej karcie nie są zamykane
+        self.records = None
+        if(self.cache):
+            self.cache.clear()
+        try:
+            uos.umount(self.mount_dir)
+        except Exception:
+            pass
+        self._retry_ms = self.RETRY_MIN_MS
+        self._next_try_ms = ticks_ms()
+        return True
+
+
+    def _enqueue(self, item):
+        """
+        :param item: Log oczekujący na kartę: tuple
+        """
+        if(len(self.pending) >= self.max_pending):
+            self.pending.pop(0)
+            self.dropped += 1
+        self.pending.append(item)
+
+
+    def _write(self, item):
+        """
+        Funkcja zapisująca log lub rekord na kartę (podnosi wyjątek przy błędzie).
+
+        :param item: (ścieżka, treść) lub (None, rekord): tuple
+        """
+        log_dir, data = item
+        if(log_dir is None):
+            self.records.append(*data)
+        elif(self.log_writer and log_dir == self.log_dir):
+            self.log_writer.write(data + "\n")
+        else:
+            f = open(log_dir, "a")
+            f.write(data + "\n")
+            f.close()
+
+
+    def _store(self, item):
+        """
+        Funkcja zapisująca log, a jeśli karta jest niedostępna - dodająca go do kolejki.
+
+        :param item: (ścieżka, treść) lub (None, rekord): tuple
+        :return: 'True' jeśli zapisano lub dodano do kolejki, 'False' przy błędzie zapisu: bool
+        """
+        if(not self.mounted or (item[0] is None and self.records is None)):
+            self._enqueue(item)
+            return True
+        try:
+            self._write(item)
+            return True
+        except Exception as e:
+            print(e)
+            print("Blad zapisu do pliku")
+            if(self._lost()):
+                self._enqueue(item)
+                return True
+            return False
+
+
+    def _replay(self):
+        """
+        Funkcja zapisująca logi z kolejki po podłączeniu karty.
+        """
+        if(self.pending):
+            print("--Zapis %d zaleglych logow--" % len(self.pending))
+        while(self.pending and self.mounted):
+            item = self.pending.pop(0)
+            try:
+                self._write(item)
+            except Exception as e:
+                print(e)
+                if(self._lost()):
+                    self.pending.insert(0, item)
+                else:
+                    print("Blad zapisu do pliku")
+
+
+    def get_status(self):
+        """
+        :return: Stan karty - podłączona, liczba logów w kolejce, liczba usuniętych logów,
+                 czas[s] do kolejnej próby podłączenia: dictionary
+        """
+        retry = 0
+        if(not self.mounted):
+            retry = max(ticks_diff(self._next_try_ms, ticks_ms()), 0) // 1000
+        return {"mounted": self.mounted, "pending": len(self.pending), "dropped": self.dropped, "retry_s": retry}
+
+
     def get_file_size(self, file_dir):
         """
         Funkcja pobierająca rozmiar pliku w bajtach
@@ -87,27 +1048,153 @@ class My_SDCard():
 
         :param log_dir: Ścieżka do pliku, w którym domyślnie mają zostać zapisane logi
         """
+        buffering = self._buffering
+        if(buffering):
+            self.disable_buffering()
         self.log_dir = log_dir
+        if(buffering):
+            self.enable_buffering(*buffering)
 
 
-    def log_data(self, log_text, log_dir=None):
+    def enable_buffering(self, buf_size=1024, max_age=30):
         """
-        Funkcja zapisująca logi w wybranym pliku
+        Funkcja włączająca buforowany zapis logów do domyślnego pliku (My_log_writer).
+        *Bez karty plik zostanie otwarty po jej podłączeniu
 
-        :param log_text: Treść logu do zapisania: string
-        :param log_dir: Opcjonalna ścieżka do pliku, w którym ma zostać zapisany log: string
-        :return: Status powodzenia, 'True' jeśli się uda zapisać, w przeciwnym razie 'False': bool
+        :param buf_size: Rozmiar bufora w bajtach (wielokrotność 512): int
+        :param max_age: Maksymalny czas[s] przechowywania wpisu w buforze: int
+        :return: Status powodzenia, 'True' jeśli się uda otworzyć plik, w przeciwnym razie 'False': bool
         """
+        self._buffering = (buf_size, max_age)
+        if(not self.mounted):
+            return True
         try:
-            if(log_dir):
-                f = open(log_dir, "a")
-            else:
-                f = open(self.log_dir, "a")
-            f.write(log_text + "\n")
-            f.close()
+            self.log_writer = My_log_writer(self.log_dir, buf_size, max_age)
             return True
+        except Exception as e:
+            print(e)
+            print("Blad otwarcia pliku z logami")
+            return False
 
+
+    def disable_buffering(self):
+        """
+        Funkcja zapisująca bufor i wyłączająca buforowany zapis logów.
+        """
+        self._buffering = None
+        if(self.log_writer):
+            try:
+                self.log_writer.close()
+            except Exception as e:
+                print(e)
+            self.log_writer = None
+
+
+    def enable_records(self, file_dir="/sd/data.bin", index_every=64):
+        """
+        Funkcja otwierająca binarny plik pomiarów (My_record_log).
+        *Bez karty plik zostanie otwarty po jej podłączeniu
+
+        :param file_dir: Ścieżka do pliku z rekordami: string
+        :param index_every: Co ile rekordów dopisywany jest wpis indeksu: int
+        :return: Status powodzenia, 'True' jeśli się uda otworzyć plik, w przeciwnym razie 'False': bool
+        """
+        self._records_cfg = (file_dir, index_every)
+        if(not self.mounted):
+            return True
+        try:
+            self.records = My_record_log(file_dir, index_every)
+            return True
+        except Exception as e:
+            print(e)
+            print("Blad otwarcia pliku z rekordami")
+            return False
+
+
+    def log_record(self, timestamp, weight_mg=None, temp=None, hum=None, flags=0):
+        """
+        Funkcja zapisująca pomiar jako rekord binarny (wymaga enable_records)
+        *Bez karty rekord trafia do kolejki w RAM
+
+        :param timestamp: Czas pomiaru[s]: int
+        :param weight_mg: Waga w mg: int
+        :param temp: Temperatura[C]: int or float
+        :param hum: Wilgotność[%]: int or float
+        :param flags: Dodatkowe flagi: int
+        :return: Status powodzenia, 'True' jeśli się uda zapisać, w przeciwnym razie 'False': bool
+        """
+        if(not self._records_cfg):
+            print("Zapis rekordow nie jest wlaczony")
+            return False
+        return self._store((None, (timestamp, weight_mg, temp, hum, flags)))
+
+
+    def open_cursor(self, records=False):
+        """
+        Funkcja tworząca kursor wysyłania dla domyślnego pliku logów lub pliku rekordów.
+
+        :param records: 'True' - plik rekordów (enable_records), 'False' - plik logów: bool
+        :return: Kursor wysyłania lub 'False' jeśli zapis rekordów nie jest włączony: My_upload_cursor or bool
+        """
+        if(records):
+            if(not self._records_cfg):
+                print("Zapis rekordow nie jest wlaczony")
+                return False
+            return My_upload_cursor(self._records_cfg[0], RECORD_SIZE, source=self)
+        return My_upload_cursor(self.log_dir, source=self)
+
+
+    def poll(self):
+        """
+        Funkcja do okresowego wywoływania - podłącza kartę (jeśli minął czas kolejnej próby),
+        zapisuje bufory logów i rekordów po przekroczeniu limitu wieku.
+        """
+        if(not self.mounted):
+            if(ticks_diff(ticks_ms(), self._next_try_ms) >= 0):
+                self._try_mount()
+            return
+
+        try:
+            if(self.log_writer):
+                self.log_writer.poll()
+            if(self.records):
+                self.records.poll()
+        except Exception as e:
+            print(e)
+            print("Blad zapisu do pliku")
+            self._lost()
+
+
+    def flush(self):
+        """
+        Funkcja zapisująca bufory logów i rekordów na kartę.
+
+        :return: Status powodzenia, 'True' jeśli się uda zapisać, w przeciwnym razie 'False': bool
+        """
+        if(not self.mounted):
+            return False
+        try:
+            if(self.log_writer):
+                self.log_writer.flush()
+            if(self.records):
+                self.records.flush()
+            if(self.cache):
+                self.cache.sync()
+            return True
         except Exception as e:
             print(e)
             print("Blad zapisu do pliku")
+            self._lost()
             return False
+
+
+    def log_data(self, log_text, log_dir=None):
+        """
+        Funkcja zapisująca logi w wybranym pliku
+        *Bez karty log trafia do kolejki w RAM (zapisywanej po podłączeniu karty)
+
+        :param log_text: Treść logu do zapisania: string
+        :param log_dir: Opcjonalna ścieżka do pliku, w którym ma zostać zapisany log: string
+        :return: Status powodzenia, 'True' jeśli się uda zapisać, w przeciwnym razie 'False': bool
+        """
+        return self._store((log_dir or self.log_dir, log_text))
@@ -0,0 +1,234 @@
+from array import array
+
+
+class My_median_filter:
+    """
+    Klasa filtru medianowego z przesuwnym oknem - odrzuca pojedyncze zakłócenia (szpilki).
+    *Okno jest przechowywane w buforze cyklicznym i posortowanej kopii - aktualizacja bez alokacji pamięci
+    """
+
+    def __init__(self, window=5):
+        """
+        :param window: Rozmiar okna (najlepiej nieparzysty): int
+        """
+        self._ring = array("i", [0] * window)
+        self._sorted = array("i", [0] * window)
+        self.reset()
+
+
+    def reset(self):
+        """Funkcja czyszcząca stan filtru"""
+        self._pos = 0
+        self._count = 0
+        self.value = None
+
+
+    def update(self, value):
+        """
+        :param value: Nowa próbka: int
+        :return: Mediana próbek w oknie: int
+        """
+        size = len(self._ring)
+        srt = self._sorted
+        count = self._count
+
+        if(count == size):
+            # usunięcie najstarszej próbki z posortowanej kopii
+            old = self._ring[self._pos]
+            i = 0
+            while(srt[i] != old):
+                i += 1
+            while(i < count - 1):
+                srt[i] = srt[i + 1]
+                i += 1
+            count -= 1
+
+        # wstawienie nowej próbki z zachowaniem kolejności
+        i = count
+        while(i > 0 and srt[i - 1] > value):
+            srt[i] = srt[i - 1]
+            i -= 1
+        srt[i] = value
+        count += 1
+
+        self._ring[self._pos] = value
+        self._pos = (self._pos + 1) % size
+        self._count = count
+
+        self.value = srt[count // 2]
+        return self.value
+
+
+
+class My_mean_filter:
+    """
+    Klasa średniej z przesuwnym oknem - suma bieżąca, aktualizacja O(1).
+    """
+
+    def __init__(self, window=10):
+        """
+        :param window: Rozmiar okna: int
+        """
+        self._ring = array("i", [0] * window)
+        self.reset()
+
+
+    def reset(self):
+        """Funkcja czyszcząca stan filtru"""
+        self._pos = 0
+        self._count = 0
+        self._sum = 0
+        self.value = None
+
+
+    def update(self, value):
+        """
+        :param value: Nowa próbka: int
+        :return: Średnia próbek w oknie (całkowita): int
+        """
+        size = len(self._ring)
+        if(self._count == size):
+            self._sum -= self._ring[self._pos]
+        else:
+            self._count += 1
+        self._ring[self._pos] = value
+        self._sum += value
+        self._pos = (self._pos + 1) % size
+
+        self.value = self._sum // self._count
+        return self.value
+
+
+
+class My_ema_filter:
+    """
+    Klasa filtru wykładniczego (low-pass) na liczbach całkowitych: y += (x - y) / 2^shift.
+    *Stan jest zachowywany między wywołaniami, pierwsza próbka inicjalizuje filtr (brak ciągnięcia do zera)
+    """
+
+    def __init__(self, shift=2):
+        """
+        :param shift: Współczynnik filtru - waga nowej próbki to 1/2^shift: int
+        """
+        self.shift = shift
+        self.reset()
+
+
+    def reset(self):
+        """Funkcja czyszcząca stan filtru"""
+        self._acc = None            #stan przeskalowany o 2^shift - bez utraty precyzji
+        self.value = None
+
+
+    def update(self, value):
+        """
+        :param value: Nowa próbka: int
+        :return: Wartość przefiltrowana: int
+        """
+        if(self._acc is None):
+            self._acc = value << self.shift
+        else:
+            self._acc += value - (self._acc >> self.shift)
+        self.value = self._acc >> self.shift
+        return self.value
+
+
+
+class My_settle_detector:
+    """
+    Klasa wykrywająca ustalenie się pomiaru - rozrzut ostatnich wartości nie przekracza tolerancji.
+    """
+
+    def __init__(self, window=5, tolerance=100):
+        """
+        :param window: Liczba ostatnich wartości branych pod uwagę: int
+        :param tolerance: Dopuszczalna różnica między wartością maksymalną i minimalną (w jednostkach surowych): int
+        """
+        self.tolerance = tolerance
+        self._ring = array("i", [0] * window)
+        self.reset()
+
+
+    def reset(self):
+        """Funkcja czyszcząca stan detektora"""
+        self._pos = 0
+        self._count = 0
+        self.settled = False
+
+
+    def update(self, value):
+        """
+        :param value: Nowa wartość: int
+        :return: 'True' jeśli pomiar się ustalił, w przeciwnym wypadku 'False': bool
+        """
+        size = len(self._ring)
+        self._ring[self._pos] = value
+        self._pos = (self._pos + 1) % size
+        if(self._count < size):
+            self._count += 1
+
+        if(self._count < size):
+            self.settled = False
+        else:
+            low = high = value
+            for x in self._ring:
+                if(x < low):
+                    low = x
+                elif(x > high):
+                    high = x
+            self.settled = high - low <= self.tolerance
+        return self.settled
+
+
+
+class My_filter_chain:
+    """
+    Klasa łącząca filtry w potok - każda próbka przechodzi kolejno przez wszystkie filtry.
+    *Błędne próbki ('False' / 'None') są pomijane - nie zmieniają stanu filtrów
+
+    Przykład:
+    chain = My_filter_chain(My_median_filter(5), My_ema_filter(2), settle=My_settle_detector(5, 100))
+    """
+
+    def __init__(self, *filters, settle=None):
+        """
+        :param filters: Filtry z metodami 'update' i 'reset': object
+        :param settle: Opcjonalny detektor ustalenia pomiaru: My_settle_detector
+        """
+        self.filters = filters
+        self.settle = settle
+        self.value = None
+
+
+    def reset(self):
+        """Funkcja czyszcząca stan wszystkich filtrów"""
+        for f in self.filters:
+            f.reset()
+        if(self.settle):
+            self.settle.reset()
+        self.value = None
+
+
+    def update(self, value):
+        """
+        :param value: Nowa próbka lub 'False' przy błędzie odczytu: int or bool
+        :return: Wartość przefiltrowana lub 'None' jeśli brak poprawnych próbek: int or None
+        """
+        if(value is False or value is None):
+            return self.value
+        for f in self.filters:
+            value = f.update(value)
+        if(self.settle):
+            self.settle.update(value)
+        self.value = value
+        return value
+
+
+    @property
+    def settled(self):
+        """
+        :return: 'True' jeśli pomiar się ustalił (bez detektora - po pierwszej poprawnej próbce): bool
+        """
+        if(self.settle):
+            return self.settle.settled
+        return self.value is not None
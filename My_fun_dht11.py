@@ -1,23 +1,117 @@
-import dht
 from machine import Pin
+from utime import ticks_ms, ticks_diff, sleep_ms
 
 """
-Moduł z funkcjami obsługującymi komunikację z czujnikiem temperatury i wilgotności DHT11.
+Moduł z funkcjami obsługującymi komunikację z czujnikiem temperatury i wilgotności DHT11 / DHT22.
 """
-myDht = dht.DHT11(Pin(5))
+
+
+class My_dht:
+    """
+    Klasa obsługująca czujnik temperatury i wilgotności DHT11 lub DHT22.
+    *Czujnik jest tworzony przy pierwszym pomiarze - import modułu nic nie kosztuje
+    *Przed upływem minimalnego odstępu między pomiarami zwracany jest ostatni wynik (także 'False' po błędzie)
+    *Przy błędzie sumy kontrolnej pomiar jest powtarzany raz
+    *Wynik to mediana z ostatnich pomiarów (odrzuca pojedyncze błędne odczyty)
+    """
+
+    MIN_INTERVAL_MS = {"DHT11": 1000, "DHT22": 2000}
+
+    def __init__(self, pin=5, model="DHT11", history=3):
+        """
+        :param pin: Pin podłączony do linii danych czujnika: int
+        :param model: Typ czujnika: "DHT11" lub "DHT22": string
+        :param history: Liczba ostatnich pomiarów do filtru medianowego: int
+        """
+        self.pin = pin
+        self.model = model
+        self.history = history
+        self.min_interval = self.MIN_INTERVAL_MS[model]
+
+        self._sensor = None
+        self._last_ms = None
+        self._temps = []
+        self._hums = []
+        self._result = False
+
+
+    def _get_sensor(self):
+        """
+        :return: Obiekt czujnika z modułu dht (tworzony przy pierwszym wywołaniu): object
+        """
+        if(self._sensor is None):
+            import dht
+            if(self.model == "DHT22"):
+                self._sensor = dht.DHT22(Pin(self.pin))
+            else:
+                self._sensor = dht.DHT11(Pin(self.pin))
+        return self._sensor
+
+
+    def _measure(self):
+        """
+        Funkcja wykonująca pomiar, przy błędzie sumy kontrolnej powtarza go raz (po minimalnym odstępie).
+
+        :return: (temperatura, wilgotność): tuple
+        """
+        sensor = self._get_sensor()
+        try:
+            sensor.measure()
+        except OSError:
+            raise               #brak odpowiedzi czujnika - powtórzenie nic nie da
+        except Exception as e:
+            print(e)
+            print("--Blad sumy kontrolnej DHT, ponowny pomiar--")
+            sleep_ms(self.min_interval)
+            sensor.measure()
+        return (sensor.temperature(), sensor.humidity())
+
+
+    def _median(self, values):
+        values = sorted(values)
+        return values[len(values) // 2]
+
+
+    def get_measure(self):
+        """
+        Funkcja odczytująca z czujnika wartość temperatury i wilgotności.
+        *Przed upływem minimalnego odstępu zwraca wynik poprzedniego pomiaru
+
+        :return: Jeśli pomiar się uda - temperatura i wilgotność: tuple: (int, int), w przeciwnym wypadku 'False': bool
+        """
+        if(self._last_ms is not None and ticks_diff(ticks_ms(), self._last_ms) < self.min_interval):
+            return self._result
+
+        try:
+            temp, hum = self._measure()
+        except Exception as e:
+            print(e)
+            print("Blad pomiaru " + self.model)
+            self._result = False
+            return False
+        finally:
+            self._last_ms = ticks_ms()
+
+        self._temps.append(temp)
+        self._hums.append(hum)
+        if(len(self._temps) > self.history):
+            self._temps.pop(0)
+            self._hums.pop(0)
+
+        self._result = (self._median(self._temps), self._median(self._hums))
+        return self._result
+
+
+_default = None
+
 
 def get_measure():
     """
-    Funkcja odczytująca z czujnika wartość temperatury i wilgotności.
+    Funkcja odczytująca z czujnika DHT11 (pin 5) wartość temperatury i wilgotności.
 
     :return: Jeśli pomiar się uda - temperatura i wilgotność: tuple: (int, int), w przeciwnym wypadku 'False': bool
     """
-    try:
-        myDht.measure()
-        temp = myDht.temperature()
-        hum = myDht.humidity()
-        return (temp, hum)
-    except Exception as e:
-        print(e)
-        print("Blad pomiaru DHT11")
-        return False
+    global _default
+    if(_default is None):
+        _default = My_dht(5, "DHT11")
+    return _default.get_measure()
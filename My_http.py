@@ -0,0 +1,222 @@
+from utime import ticks_ms, ticks_diff, sleep_ms
+
+
+class My_http_response:
+    """
+    Klasa odczytująca odpowiedź http strumieniowo (np. z UART modułu sim800l).
+    *Dane są czytane do wstępnie zaalokowanego bufora - cała odpowiedź nie musi mieścić się w pamięci
+    *Obsługuje nagłówek 'Content-Length' oraz 'Transfer-Encoding: chunked'
+    *Bez długości treści ciało odpowiedzi kończy się po upływie czasu 'timeout' bez nowych danych
+    *Linie przed linią statusu (np. echo zapytania, 'SEND OK') są pomijane
+
+    Przykładowa procedura:
+    1. Utworzenie obiektu po wysłaniu zapytania (odczyt statusu i nagłówków)
+    2. Odczyt treści fragmentami (readinto / read)
+    3. Zamknięcie (close)
+    """
+
+    def __init__(self, stream, timeout=10, buf_size=256, on_close=None):
+        """
+        :param stream: Źródło danych z metodami 'any' i 'readinto' (np. UART): object
+        :param timeout: Maksymalny czas[s] oczekiwania na kolejne dane: int or float
+        :param buf_size: Rozmiar bufora odczytu w bajtach: int
+        :param on_close: Opcjonalna funkcja wywoływana przy zamknięciu odpowiedzi: function
+        """
+        self.stream = stream
+        self.timeout = timeout
+        self.on_close = on_close
+
+        self._buf = bytearray(buf_size)
+        self._mv = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+
+        self.status = None
+        self.reason = ""
+        self.headers = {}
+
+        self._remaining = -1        #pozostała długość treści, -1 - nieznana
+        self._chunked = False
+        self._chunk_end = False     #przed kolejnym fragmentem trzeba pominąć '\r\n'
+        self._done = False
+        self._closed = False
+
+        self._read_head()
+
+
+    def _fill(self):
+        """
+        Funkcja dopisująca dane ze strumienia do bufora (czeka maksymalnie 'timeout').
+
+        :return: Liczba odczytanych bajtów, 0 jeśli upłynął czas: int
+        """
+        if(self._start > 0):
+            # przesunięcie nieodczytanych danych na początek bufora
+            length = self._end - self._start
+            self._buf[:length] = self._mv[self._start : self._end]
+            self._start = 0
+            self._end = length
+        if(self._end == len(self._buf)):
+            return 0
+
+        t = ticks_ms()
+        while(ticks_diff(ticks_ms(), t) < self.timeout * 1000):
+            if(self.stream.any()):
+                n = self.stream.readinto(self._mv[self._end :])
+                if(n):
+                    self._end += n
+                    return n
+            else:
+                sleep_ms(5)
+        return 0
+
+
+    def _readline(self):
+        """
+        Funkcja odczytująca jedną linię (bez '\\r\\n').
+        *Linia dłuższa niż bufor jest obcinana do rozmiaru bufora - reszta do '\\n' jest pomijana
+
+        :return: Linia lub 'None', jeśli nie udało się jej odczytać (brak danych): bytes or None
+        """
+        line = None
+        while(True):
+            for i in range(self._start, self._end):
+                if(self._buf[i] == 10):
+                    if(line is None):
+                        line = bytes(self._mv[self._start : i])
+                    self._start = i + 1
+                    return line.rstrip(b"\r")
+            if(self._start == 0 and self._end == len(self._buf)):
+                # pełny bufor bez końca linii - zapamiętanie początku linii i odrzucenie reszty
+                if(line is None):
+                    print("--Linia odpowiedzi dluzsza niz bufor, zostanie obcieta--")
+                    line = bytes(self._buf)
+                self._end = 0
+            if(not self._fill()):
+                return None
+
+
+    def _read_head(self):
+        """
+        Funkcja odczytująca linię statusu i nagłówki.
+        """
+        line = self._readline()
+        while(line is not None and not line.startswith(b"HTTP/")):
+            line = self._readline()
+        if(line is None):
+            self._done = True
+            return
+
+        parts = line.decode("utf-8").split(" ", 2)
+        self.status = int(parts[1])
+        if(len(parts) > 2):
+            self.reason = parts[2]
+
+        line = self._readline()
+        while(line):
+            index = line.find(b":")
+            if(index > 0):
+                name = line[:index].decode("utf-8").strip().lower()
+                self.headers[name] = line[index + 1:].decode("utf-8").strip()
+            line = self._readline()
+
+        if(self.headers.get("transfer-encoding", "").lower() == "chunked"):
+            self._chunked = True
+            self._remaining = 0
+        elif("content-length" in self.headers):
+            self._remaining = int(self.headers["content-length"])
+            self._done = self._remaining == 0
+
+
+    def _next_chunk(self):
+        """
+        Funkcja odczytująca rozmiar kolejnego fragmentu (chunked).
+        """
+        if(self._chunk_end):
+            self._readline()        #'\r\n' po poprzednim fragmencie
+        self._chunk_end = True
+        line = self._readline()
+        if(line is None):
+            self._done = True
+            return
+        self._remaining = int(line.split(b";")[0].strip(), 16)
+        if(self._remaining == 0):
+            # pominięcie nagłówków końcowych
+            line = self._readline()
+            while(line):
+                line = self._readline()
+            self._done = True
+
+
+    def readinto(self, buf):
+        """
+        Funkcja odczytująca kolejny fragment treści odpowiedzi do bufora.
+
+        :param buf: Bufor na dane: bytearray or memoryview
+        :return: Liczba odczytanych bajtów, 0 na końcu treści: int
+        """
+        if(self._done):
+            return 0
+
+        if(self._chunked and self._remaining == 0):
+            self._next_chunk()
+            if(self._done):
+                return 0
+
+        if(self._start == self._end and not self._fill()):
+            self._done = True
+            return 0
+
+        n = min(len(buf), self._end - self._start)
+        if(self._remaining >= 0):
+            n = min(n, self._remaining)
+        buf[:n] = self._mv[self._start : self._start + n]
+        self._start += n
+
+        if(self._remaining >= 0):
+            self._remaining -= n
+            if(self._remaining == 0 and not self._chunked):
+                self._done = True
+        return n
+
+
+    def read(self, size=-1):
+        """
+        Funkcja odczytująca treść odpowiedzi.
+
+        :param size: Maksymalna liczba bajtów, domyślnie cała pozostała treść: int
+        :return: Odczytane dane: bytes
+        """
+        if(size >= 0):
+            buf = bytearray(size)
+            n = self.readinto(buf)
+            return bytes(buf[:n])
+
+        data = b""
+        chunk = bytearray(len(self._buf))
+        n = self.readinto(chunk)
+        while(n):
+            data += chunk[:n]
+            n = self.readinto(chunk)
+        return data
+
+
+    def text(self):
+        """
+        :return: Cała pozostała treść odpowiedzi jako tekst: string
+        """
+        return self.read().decode("utf-8")
+
+
+    def close(self):
+        """
+        Funkcja kończąca odczyt - pomija nieodczytaną treść i wywołuje 'on_close'.
+        """
+        if(self._closed):
+            return
+        self._closed = True
+        chunk = bytearray(64)
+        while(self.readinto(chunk)):
+            pass
+        if(self.on_close):
+            self.on_close()
@@ -1,6 +1,167 @@
-from machine import Pin
+from machine import Pin, disable_irq, enable_irq
 from utime import sleep_us, time
 from micropython import const
+from array import array
+import micropython
+import uos
+
+
+# szybki odczyt bezpośrednio przez rejestry GPIO ESP32 (tylko piny 0-31 dla SCK)
+# adresy rejestrów są inne w ESP32-S2/S3/C3 (one też zgłaszają sys.platform == "esp32") - sprawdzany jest model układu
+_GPIO_OUT_W1TS = const(0x3FF44008)
+_GPIO_OUT_W1TC = const(0x3FF4400C)
+_GPIO_IN = const(0x3FF4403C)
+_GPIO_IN1 = const(0x3FF44040)
+
+try:
+    _classic_esp32 = uos.uname().machine.endswith("with ESP32")      #np. "Generic ESP32 module with ESP32"
+except AttributeError:
+    _classic_esp32 = False
+
+if(_classic_esp32):
+    @micropython.viper
+    def _shift_in_viper(clk_mask: int, in_addr: int, data_bit: int, bits: int, pulses: int) -> int:
+        w1ts = ptr32(_GPIO_OUT_W1TS)
+        w1tc = ptr32(_GPIO_OUT_W1TC)
+        gpio_in = ptr32(in_addr)
+        data = 0
+        bit = 0
+        for i in range(bits):
+            w1ts[0] = clk_mask
+            bit = gpio_in[0]        #odczyty rejestru wydłużają impuls SCK do wymaganych >=0.2us
+            bit = gpio_in[0]
+            w1tc[0] = clk_mask
+            data = (data << 1) | ((bit >> data_bit) & 1)
+            bit = gpio_in[0]
+        for i in range(pulses):
+            w1ts[0] = clk_mask
+            bit = gpio_in[0]
+            bit = gpio_in[0]
+            w1tc[0] = clk_mask
+            bit = gpio_in[0]
+        return data
+
+    @micropython.viper
+    def _shift_in_many_viper(clk_mask: int, in_addr: int, data_bits, out, count: int, bits: int, pulses: int):
+        w1ts = ptr32(_GPIO_OUT_W1TS)
+        w1tc = ptr32(_GPIO_OUT_W1TC)
+        gpio_in = ptr32(in_addr)
+        data_bit = ptr8(data_bits)
+        values = ptr32(out)
+        for k in range(count):
+            values[k] = 0
+        level = 0
+        for i in range(bits):
+            w1ts[0] = clk_mask
+            level = gpio_in[0]
+            level = gpio_in[0]      #wszystkie linie DT odczytane jednym dostępem do rejestru
+            w1tc[0] = clk_mask
+            for k in range(count):
+                values[k] = (values[k] << 1) | ((level >> data_bit[k]) & 1)
+        for i in range(pulses):
+            w1ts[0] = clk_mask
+            level = gpio_in[0]
+            level = gpio_in[0]
+            w1tc[0] = clk_mask
+            level = gpio_in[0]
+else:
+    _shift_in_viper = None
+    _shift_in_many_viper = None
+
+
+# liczba dodatkowych impulsów SCK po 24 bitach -> kanał i wzmocnienie kolejnej konwersji
+GAIN_PULSES = {128: 1, 32: 2, 64: 3}        #A/128 - 25 impulsów, B/32 - 26, A/64 - 27
+
+
+def _sort(buf, count):
+    """
+    Sortowanie przez wstawianie pierwszych 'count' elementów bufora (w miejscu, bez alokacji).
+
+    :param buf: Bufor próbek: array
+    :param count: Liczba próbek: int
+    """
+    for i in range(1, count):
+        value = buf[i]
+        j = i - 1
+        while(j >= 0 and buf[j] > value):
+            buf[j + 1] = buf[j]
+            j -= 1
+        buf[j + 1] = value
+
+
+def mean(buf, count=None):
+    """
+    :param buf: Bufor próbek: array
+    :param count: Liczba próbek od początku bufora, domyślnie cały bufor: int
+    :return: Średnia próbek lub 'False' jeśli brak próbek: float or bool
+    """
+    if(count is None):
+        count = len(buf)
+    if(not count):
+        return False
+    total = 0
+    for i in range(count):
+        total += buf[i]
+    return total / count
+
+
+def median(buf, count=None):
+    """
+    *Sortuje próbki w buforze
+
+    :param buf: Bufor próbek: array
+    :param count: Liczba próbek od początku bufora, domyślnie cały bufor: int
+    :return: Mediana próbek lub 'False' jeśli brak próbek: float or bool
+    """
+    if(count is None):
+        count = len(buf)
+    if(not count):
+        return False
+    _sort(buf, count)
+    half = count // 2
+    if(count % 2):
+        return buf[half]
+    return (buf[half - 1] + buf[half]) / 2
+
+
+def trimmed_mean(buf, count=None, trim=0.2):
+    """
+    Średnia z pominięciem skrajnych próbek (odporna na zakłócenia).
+    *Sortuje próbki w buforze
+
+    :param buf: Bufor próbek: array
+    :param count: Liczba próbek od początku bufora, domyślnie cały bufor: int
+    :param trim: Część próbek odrzucanych z każdej strony (0 - 0.5): float
+    :return: Średnia lub 'False' jeśli brak próbek: float or bool
+    """
+    if(count is None):
+        count = len(buf)
+    if(not count):
+        return False
+    _sort(buf, count)
+    cut = int(count * trim)
+    if(2 * cut >= count):
+        cut = (count - 1) // 2
+    total = 0
+    for i in range(cut, count - cut):
+        total += buf[i]
+    return total / (count - 2 * cut)
+
+
+def _scale_mg(diff, scale_q):
+    """
+    Mnożenie odczytu przez skalę Q16 bez przekroczenia zakresu małych liczb całkowitych (31 bitów, bez alokacji).
+    *Skala jest dzielona na część całkowitą i ułamkową, a odczyt na starsze bity i młodsze 12 bitów
+
+    :param diff: Odczyt po odjęciu offsetu (24 bity ze znakiem): int
+    :param scale_q: Skala w mg na jednostkę odczytu * 2^16: int
+    :return: Waga w mg: int
+    """
+    whole = scale_q >> 16
+    frac = scale_q & 0xFFFF
+    high = diff >> 12
+    low = diff & 0xFFF
+    return diff * whole + ((high * frac) >> 4) + ((low * frac + 0x8000) >> 16)
 
 
 class My_hx711():
@@ -15,17 +176,20 @@ class My_hx711():
     Przykładowa procedura:
     1. Inicjalizacja
     2. Kalibracja
-    3. Odczyt wagi
+    3. Opcjonalnie: uruchomienie pomiarów w tle (start_background)
+    4. Odczyt wagi
     """
 
     READY_TIMEOUT_SEC = const(5)
     DATA_RANGE = const(24)
+    SCALE_SHIFT = const(16)     #skala w formacie stałoprzecinkowym: mg na jednostkę odczytu * 2^16
 
-    def __init__(self, clk_pin, data_pin, max_weight=20):
+    def __init__(self, clk_pin, data_pin, max_weight=20, fast=True):
         """
         :param clk_pin: Wyjście zegarowe podłączone do SCK: int
         :param data_pin: Wejście danych podłączone do DT: int
         :param max_weight: Zakres pomiarowy belki tensometrycznej: int
+        :param fast: Odczyt przez rejestry GPIO (viper), jeśli dostępny - w przeciwnym wypadku przez Pin.value(): bool
         """
         self.clk_pin = Pin(clk_pin, Pin.OUT)
         self.data_pin = Pin(data_pin, Pin.IN)
@@ -33,8 +197,24 @@ class My_hx711():
         self.clk_pin.value(0)
         self.data_pin.value(0)
 
-        self.cal = 0
+        self.offset = 0             #odczyt bez obciążenia (kalibracja): int
         self.max_weight = max_weight
+        self.scale_q = (max_weight * 1192 << self.SCALE_SHIFT) // 10000      #max_weight * 0.0001192 g -> mg, Q16
+        self._burst = array("i", [0] * 20)
+
+        self.fast = fast and _shift_in_viper is not None and clk_pin < 32
+        self._clk_mask = 1 << clk_pin
+        self._in_addr = _GPIO_IN if data_pin < 32 else _GPIO_IN1
+        self._data_bit = data_pin % 32
+
+        self.filter = None          #opcjonalny potok filtrów (My_filters.My_filter_chain)
+
+        self._ring = None           #bufor cykliczny próbek pobieranych w tle
+        self._ring_pos = 0
+        self._ring_count = 0
+        self._scheduled = False
+        self._busy = False          #odczyt seryjny w toku - próbki w tle są wstrzymane
+        self._sample_ref = self._sample_scheduled       #referencja tworzona raz - bez alokacji w przerwaniu
 
 
     def _wait(self):
@@ -66,14 +246,50 @@ class My_hx711():
         return self.data_pin.value() == 0
 
 
-    def calibrate(self):
+    @property
+    def cal(self):
+        """
+        :return: Odczyt bez obciążenia (kalibracja): int
+        """
+        return self.offset
+
+
+    @cal.setter
+    def cal(self, value):
+        self.offset = int(round(value))
+
+
+    def calibrate(self, samples=20):
         """
-        Funkcja kalibrująca urządzenie, zajmuje kilka do kilkunastu sekund
+        Funkcja kalibrująca urządzenie (średnia obcięta z serii pomiarów), zajmuje kilka sekund
 
-        :return: Błąd odczytu: float
+        :param samples: Liczba pomiarów: int
+        :return: Błąd odczytu: int
         """
-        self.cal = self.read_filtered(50, 5)
-        return self.cal
+        buf = array("i", [0] * samples)
+        count = self.read_burst(buf)
+        if(count):
+            self.cal = trimmed_mean(buf, count)
+        return self.offset
+
+
+    def calibrate_weight(self, weight_g, samples=20):
+        """
+        Funkcja wyznaczająca skalę na podstawie wzorcowego obciążenia (po kalibracji bez obciążenia).
+
+        :param weight_g: Masa wzorca w g: int
+        :param samples: Liczba pomiarów: int
+        :return: Skala w mg na jednostkę odczytu * 2^16 lub 'False' jeśli pomiar się nie udał: int or bool
+        """
+        buf = array("i", [0] * samples)
+        count = self.read_burst(buf)
+        if(not count):
+            return False
+        value = int(round(trimmed_mean(buf, count))) - self.offset
+        if(value == 0):
+            return False
+        self.scale_q = (weight_g * 1000 << self.SCALE_SHIFT) // value
+        return self.scale_q
 
 
     def power_on(self):
@@ -87,12 +303,62 @@ class My_hx711():
         sleep_us(60)
 
 
+    def _shift_in(self):
+        """
+        Funkcja taktująca linię SCK i odczytująca 24 bity danych (układ musi być gotowy).
+        *Wybiera szybki odczyt przez rejestry (viper) lub odczyt przez Pin.value() - wyniki są identyczne
+
+        :return: Odczyt w postaci DEC: int
+        """
+        if(self.fast):
+            return self._shift_in_fast()
+        return self._shift_in_pin()
+
+
+    def _shift_in_fast(self):
+        """
+        Odczyt przez rejestry GPIO ESP32 - przerwania wyłączone na czas taktowania (~30us),
+        aby SCK nie pozostał w stanie wysokim dłużej niż 60us (wyłączenie układu).
+
+        :return: Odczyt w postaci DEC: int
+        """
+        state = disable_irq()
+        try:
+            data = _shift_in_viper(self._clk_mask, self._in_addr, self._data_bit, self.DATA_RANGE, 1)
+        finally:
+            enable_irq(state)
+        return self._U2_conversion(data)
+
+
+    def _shift_in_pin(self):
+        """
+        Odczyt przez Pin.value() (wszystkie porty).
+
+        :return: Odczyt w postaci DEC: int
+        """
+        data = 0
+        for i in range(self.DATA_RANGE):
+            self.clk_pin.value(1)
+            self.clk_pin.value(0)
+
+            data = data << 1 | self.data_pin.value()
+
+        self.clk_pin.value(1)
+        self.clk_pin.value(0)
+
+        return self._U2_conversion(data)
+
+
     def read_raw(self):
         """
         Funkcja pobierająca dane z ukłądu hx711
 
         :return: Odczyt w postaci DEC lub 'False' keśli wystąpi błąd: int or bool
         """
+        if(self._ring is not None):
+            self._kick()
+            return self._latest()
+
         if(not self.is_ready()):
             try:
                 self._wait()
@@ -100,51 +366,470 @@ class My_hx711():
                 print(e)
                 return False
 
-        data = 0
-        for i in range(self.DATA_RANGE):
-            self.clk_pin.value(1)
-            self.clk_pin.value(0)
+        return self._shift_in()
 
-            data = data << 1 | self.data_pin.value()
 
-        self.clk_pin.value(1)
-        self.clk_pin.value(0)
+    def read_burst(self, buf, count=None):
+        """
+        Funkcja wypełniająca bufor kolejnymi pomiarami (bez alokacji pamięci na każdą próbkę).
 
-        return self._U2_conversion(data)
+        :param buf: Bufor na pomiary: array('i')
+        :param count: Liczba pomiarów, domyślnie rozmiar bufora: int
+        :return: Liczba odczytanych pomiarów (mniejsza przy błędzie): int
+        """
+        if(count is None):
+            count = len(buf)
+
+        self._busy = True
+        try:
+            for i in range(count):
+                if(not self.is_ready()):
+                    try:
+                        self._wait()
+                    except Exception as e:
+                        print(e)
+                        return i
+                buf[i] = self._shift_in()
+        finally:
+            self._busy = False
+        return count
+
+
+    def start_background(self, size=16):
+        """
+        Funkcja uruchamiająca pobieranie próbek w tle.
+        Przerwanie na zboczu opadającym linii DT (gotowy pomiar) zleca przez micropython.schedule
+        odczyt próbki do bufora cyklicznego - odczyt wagi nie czeka wtedy na konwersje.
+
+        :param size: Liczba próbek w buforze (uśrednianych przy odczycie wagi): int
+        """
+        self._ring = array("i", [0] * size)
+        self._ring_pos = 0
+        self._ring_count = 0
+        self._scheduled = False
+        self.data_pin.irq(trigger=Pin.IRQ_FALLING, handler=self._irq)
+        self._kick()            #DT mógł być już w stanie niskim - zbocze nie wystąpi
+
+
+    def stop_background(self):
+        """Funkcja zatrzymująca pobieranie próbek w tle"""
+        self.data_pin.irq(handler=None)
+        self._ring = None
+
+
+    def _irq(self, pin):
+        """
+        Obsługa przerwania - tylko zlecenie odczytu (bez alokacji pamięci).
+        """
+        if(not self._scheduled):
+            self._scheduled = True
+            try:
+                micropython.schedule(self._sample_ref, 0)
+            except RuntimeError:
+                self._scheduled = False         #kolejka schedule pełna - próbkę odczyta _kick przy odczycie wagi
+
+
+    def _sample_scheduled(self, _):
+        """
+        Funkcja odczytująca próbkę do bufora cyklicznego (wywoływana przez micropython.schedule).
+        """
+        ring = self._ring
+        if(ring is not None and not self._busy and self.is_ready()):
+            # taktowanie SCK zmienia stan DT - przerwania w trakcie odczytu są ignorowane dzięki '_scheduled'
+            value = self._shift_in()
+            ring[self._ring_pos] = value
+            if(self.filter):
+                self.filter.update(value)
+            self._ring_pos = (self._ring_pos + 1) % len(ring)
+            if(self._ring_count < len(ring)):
+                self._ring_count += 1
+        self._scheduled = False
+
+
+    def _kick(self):
+        """
+        Funkcja odczytująca zaległą próbkę, jeśli przerwanie jej nie zleciło.
+        *hx711 trzyma DT w stanie niskim do odczytu próbki - bez odczytu nie będzie kolejnego zbocza i przerwania
+        """
+        state = disable_irq()
+        pending = not self._scheduled and self.is_ready()
+        if(pending):
+            self._scheduled = True
+        enable_irq(state)
+        if(pending):
+            self._sample_scheduled(0)
+
+
+    def _latest(self):
+        """
+        :return: Ostatnia próbka z bufora cyklicznego lub 'False' jeśli brak próbek: int or bool
+        """
+        if(not self._ring_count):
+            return False
+        return self._ring[(self._ring_pos - 1) % len(self._ring)]
+
+
+    def _background_average(self):
+        """
+        :return: Średnia (całkowita) próbek z bufora cyklicznego: int
+        """
+        ring = self._ring
+        count = self._ring_count
+        total = 0
+        for i in range(count):
+            total += ring[i]
+        return total // count
+
+
+    def set_filter(self, chain):
+        """
+        Funkcja ustawiająca potok filtrów - zachowuje stan między odczytami i jest używany przy odczycie wagi.
+
+        :param chain: Potok filtrów lub 'None' aby wyłączyć: My_filter_chain
+        """
+        self.filter = chain
 
 
     def read_filtered(self, cycles=10, dt=4):
         """
         Funkcja pobierająca i uśredniająca dane z ukłądu hx711 (filtr low-pass)
+        *Jeśli ustawiono potok filtrów (set_filter), próbki przechodzą przez niego zamiast przez filtr low-pass
+        *Błędne odczyty są pomijane
         :param cycles: Ilość pomiarów do uśrednienia: int
         :param dt: Współczynnik filtru low-pass: int
 
-        :return: Średnia wartość z iluś pomiarów: float
+        :return: Średnia wartość z iluś pomiarów lub 'False' jeśli wszystkie odczyty się nie udały: float or bool
         """
-        average = 0
+        if(self.filter):
+            for i in range(cycles):
+                self.filter.update(self.read_raw())
+            return self.filter.value if self.filter.value is not None else False
+
+        average = None
         for i in range(cycles):
-            average = average *dt
-            average += self.read_raw()
-            average = average / (dt + 1)
+            value = self.read_raw()
+            if(value is False):
+                continue
+            if(average is None):
+                average = value         #inicjalizacja pierwszym odczytem zamiast zerem
+            else:
+                average = (average * dt + value) / (dt + 1)
 
-        return average
+        return average if average is not None else False
+
+
+    def read_stable(self, max_samples=20):
+        """
+        Funkcja podająca próbki do potoku filtrów, aż pomiar się ustali (wymaga set_filter).
+
+        :param max_samples: Maksymalna liczba pomiarów: int
+        :return: Wartość przefiltrowana lub 'False' jeśli pomiar się nie ustalił: int or bool
+        """
+        chain = self.filter
+        for i in range(max_samples):
+            chain.update(self.read_raw())
+            if(chain.settled):
+                return chain.value
+        return False
+
+
+    def _read_value(self):
+        """
+        Funkcja zwracająca przefiltrowany odczyt (tylko arytmetyka całkowita).
+        *Przy pomiarach w tle zwraca od razu średnią z bufora próbek
+        *Z potokiem filtrów (set_filter) czeka tylko do ustalenia się pomiaru
+        *W przeciwnym wypadku średnia z serii pomiarów
+
+        :return: Odczyt lub 'False' jeśli pomiar się nie udał: int or bool
+        """
+        if(self._ring is not None):
+            self._kick()
+        if(self._ring is not None and self._ring_count):
+            if(self.filter and self.filter.value is not None):
+                return self.filter.value
+            return self._background_average()
+
+        if(self.filter):
+            value = self.read_stable(20)
+            if(value is False and self.filter.value is not None):
+                value = self.filter.value
+            return value
+
+        count = self.read_burst(self._burst)
+        if(not count):
+            return False
+        total = 0
+        for i in range(count):
+            total += self._burst[i]
+        return total // count
+
+
+    def get_weight_mg(self):
+        """
+        Funkcja mierząca wagę w mg (uwzględnia kalibrację), bez obliczeń zmiennoprzecinkowych
+
+        :return: Waga w mg lub 'False' jeśli pomiar się nie udał: int or bool
+        """
+        value = self._read_value()
+        if(value is False):
+            return False
+        return self.raw_to_mg(value)
+
+
+    def raw_to_mg(self, value):
+        """
+        Funkcja przeliczająca surowy odczyt na wagę w mg (uwzględnia kalibrację)
+
+        :param value: Surowy odczyt: int
+        :return: Waga w mg: int
+        """
+        return _scale_mg(value - self.offset, self.scale_q)
+
+
+    def get_weight_g_int(self):
+        """
+        Funkcja mierząca wagę w g zaokrągloną do całości (uwzględnia kalibrację)
+
+        :return: Waga w g lub 'False' jeśli pomiar się nie udał: int or bool
+        """
+        weight = self.get_weight_mg()
+        if(weight is False):
+            return False
+        return (weight + 500) // 1000
 
 
     def get_weight_g(self):
         """
         Funkcja mierząca wagę w g (uwzględnia kalibrację)
 
-        :return: Waga w g: float
+        :return: Waga w g lub 'False' jeśli pomiar się nie udał: float or bool
         """
-        value = self.read_filtered(20, 4) - self.cal
-        weight = self.max_weight * 0.0001192 * value
-        return round(weight, 1)
+        weight = self.get_weight_mg()
+        if(weight is False):
+            return False
+        return round(weight / 1000, 1)
 
 
     def get_weight_kg(self):
         """
         Funkcja mierząca wagę w kg (uwzględnia kalibrację)
 
-        :return: Waga w kg: float
+        :return: Waga w kg lub 'False' jeśli pomiar się nie udał: float or bool
+        """
+        weight = self.get_weight_mg()
+        if(weight is False):
+            return False
+        return round(weight / 1000000, 3)
+
+
+
+class My_hx711_array():
+    """
+    Klasa obsługująca kilka układów hx711 ze wspólną linią SCK (np. wagi wielu uli).
+    Wszystkie linie DT są odczytywane w tej samej pętli taktowania - N wag jest odczytywanych w czasie jednej.
+    *Każda waga ma własną kalibrację (offset i skala)
+    *Wzmocnienie/kanał wybierane przy każdym odczycie (128 - kanał A, 64 - kanał A, 32 - kanał B)
+
+    Przykładowa procedura:
+    1. Inicjalizacja
+    2. Kalibracja
+    3. Odczyt wag (get_weights_g / get_weights_mg)
+    """
+
+    READY_TIMEOUT_SEC = const(5)
+    DATA_RANGE = const(24)
+    SCALE_SHIFT = const(16)
+
+    def __init__(self, clk_pin, data_pins, max_weight=20, fast=True):
+        """
+        :param clk_pin: Wyjście zegarowe podłączone do SCK wszystkich układów: int
+        :param data_pins: Wejścia danych podłączone do DT kolejnych układów: list
+        :param max_weight: Zakres pomiarowy belek tensometrycznych: int
+        :param fast: Odczyt przez rejestry GPIO (viper), jeśli dostępny: bool
+        """
+        self.clk_pin = Pin(clk_pin, Pin.OUT)
+        self.data_pins = [Pin(pin, Pin.IN) for pin in data_pins]
+        self.clk_pin.value(0)
+
+        count = len(data_pins)
+        self.values = array("i", [0] * count)               #ostatnie surowe odczyty
+        self.offsets = array("i", [0] * count)
+        self.scales_q = [(max_weight * 1192 << self.SCALE_SHIFT) // 10000] * count
+        self._gain = 128
+
+        same_bank = all(pin < 32 for pin in data_pins) or all(pin >= 32 for pin in data_pins)
+        self.fast = fast and _shift_in_many_viper is not None and clk_pin < 32 and same_bank
+        self._clk_mask = 1 << clk_pin
+        self._in_addr = _GPIO_IN if data_pins[0] < 32 else _GPIO_IN1
+        self._data_bits = bytearray(pin % 32 for pin in data_pins)
+
+
+    def __len__(self):
+        return len(self.data_pins)
+
+
+    def is_ready(self):
+        """
+        :return: 'True' jeśli wszystkie układy gotowe do komunikacji, w przeciwnym wypadku 'False': bool
         """
-        return round(self.get_weight_g() / 1000, 3)
+        for pin in self.data_pins:
+            if(pin.value()):
+                return False
+        return True
+
+
+    def _wait(self):
+        """
+        Funkcja czeka aż wszystkie układy będą gotowe, w przeciwnym wypadku podniesie wyjątek po określonym czasie
+        """
+        time_0 = time()
+        while(not self.is_ready()):
+            if(time() - time_0 > self.READY_TIMEOUT_SEC):
+                raise Exception("hx711 nie odpowiada!")
+
+
+    def _shift_in(self, pulses):
+        """
+        Funkcja taktująca wspólną linię SCK i odczytująca 24 bity z każdej linii DT do 'values'.
+
+        :param pulses: Liczba dodatkowych impulsów SCK (wybór wzmocnienia): int
+        """
+        values = self.values
+        if(self.fast):
+            state = disable_irq()
+            try:
+                _shift_in_many_viper(self._clk_mask, self._in_addr, self._data_bits, values, len(values),
+                                     self.DATA_RANGE, pulses)
+            finally:
+                enable_irq(state)
+        else:
+            pins = self.data_pins
+            count = len(pins)
+            for k in range(count):
+                values[k] = 0
+            for i in range(self.DATA_RANGE):
+                self.clk_pin.value(1)
+                self.clk_pin.value(0)
+                for k in range(count):
+                    values[k] = values[k] << 1 | pins[k].value()
+            for i in range(pulses):
+                self.clk_pin.value(1)
+                self.clk_pin.value(0)
+
+        # konwersja U2 --> DEC
+        sign = 1 << (self.DATA_RANGE - 1)
+        for k in range(len(values)):
+            if(values[k] & sign):
+                values[k] -= 1 << self.DATA_RANGE
+
+
+    def read_raw(self, gain=128):
+        """
+        Funkcja pobierająca dane ze wszystkich układów w jednym przebiegu.
+        *Wzmocnienie obowiązuje od kolejnej konwersji - przy jego zmianie pierwszy odczyt jest pomijany
+
+        :param gain: Wzmocnienie i kanał: 128 (A), 64 (A) lub 32 (B): int
+        :return: Surowe odczyty kolejnych wag lub 'False' jeśli wystąpi błąd: array or bool
+        """
+        pulses = GAIN_PULSES[gain]
+        try:
+            if(gain != self._gain):
+                self._wait()
+                self._shift_in(pulses)
+                self._gain = gain
+            self._wait()
+        except Exception as e:
+            print(e)
+            return False
+
+        self._shift_in(pulses)
+        return self.values
+
+
+    def _read_average(self, samples, gain):
+        """
+        :param samples: Liczba pomiarów do uśrednienia: int
+        :param gain: Wzmocnienie i kanał: int
+        :return: Średnie (całkowite) odczyty kolejnych wag lub 'False' jeśli wystąpi błąd: list or bool
+        """
+        totals = [0] * len(self.values)
+        for i in range(samples):
+            values = self.read_raw(gain)
+            if(values is False):
+                return False
+            for k in range(len(totals)):
+                totals[k] += values[k]
+        return [total // samples for total in totals]
+
+
+    def calibrate(self, samples=10, gain=128):
+        """
+        Funkcja kalibrująca wszystkie wagi (bez obciążenia)
+
+        :param samples: Liczba pomiarów: int
+        :param gain: Wzmocnienie i kanał: int
+        :return: 'True' jeśli się udało, w przeciwnym wypadku 'False': bool
+        """
+        values = self._read_average(samples, gain)
+        if(values is False):
+            return False
+        for k in range(len(values)):
+            self.offsets[k] = values[k]
+        return True
+
+
+    def calibrate_weight(self, cell, weight_g, samples=10, gain=128):
+        """
+        Funkcja wyznaczająca skalę jednej wagi na podstawie wzorcowego obciążenia.
+
+        :param cell: Numer wagi: int
+        :param weight_g: Masa wzorca w g: int
+        :param samples: Liczba pomiarów: int
+        :param gain: Wzmocnienie i kanał: int
+        :return: Skala w mg na jednostkę odczytu * 2^16 lub 'False' jeśli pomiar się nie udał: int or bool
+        """
+        values = self._read_average(samples, gain)
+        if(values is False or values[cell] == self.offsets[cell]):
+            return False
+        self.scales_q[cell] = (weight_g * 1000 << self.SCALE_SHIFT) // (values[cell] - self.offsets[cell])
+        return self.scales_q[cell]
+
+
+    def get_weights_mg(self, samples=1, gain=128):
+        """
+        Funkcja mierząca wagi w mg (uwzględnia kalibrację)
+
+        :param samples: Liczba pomiarów do uśrednienia: int
+        :param gain: Wzmocnienie i kanał: int
+        :return: Wagi w mg lub 'False' jeśli pomiar się nie udał: list or bool
+        """
+        values = self._read_average(samples, gain)
+        if(values is False):
+            return False
+        return [_scale_mg(values[k] - self.offsets[k], self.scales_q[k]) for k in range(len(values))]
+
+
+    def get_weights_g(self, samples=1, gain=128):
+        """
+        Funkcja mierząca wagi w g (uwzględnia kalibrację)
+
+        :param samples: Liczba pomiarów do uśrednienia: int
+        :param gain: Wzmocnienie i kanał: int
+        :return: Wagi w g lub 'False' jeśli pomiar się nie udał: list or bool
+        """
+        weights = self.get_weights_mg(samples, gain)
+        if(weights is False):
+            return False
+        return [round(weight / 1000, 1) for weight in weights]
+
+
+    def power_on(self):
+        """Funkcja włączająca wszystkie układy hx711 (po włączeniu wzmocnienie wraca do 128)"""
+        self.clk_pin.value(0)
+        self._gain = 128
+
+
+    def power_off(self):
+        """Funkcja wyłączająca wszystkie układy hx711"""
+        self.clk_pin.value(1)
+        sleep_us(60)
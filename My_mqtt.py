@@ -0,0 +1,481 @@
+import uos
+import uselect
+import ustruct
+from utime import ticks_ms, ticks_diff
+from micropython import const
+
+# Typy pakietów MQTT 3.1.1 (starsze 4 bity pierwszego bajtu)
+_CONNECT = const(0x10)
+_CONNACK = const(0x20)
+_PUBLISH = const(0x30)
+_PUBACK = const(0x40)
+_SUBSCRIBE = const(0x82)
+_SUBACK = const(0x90)
+_PINGREQ = const(0xC0)
+_PINGRESP = const(0xD0)
+_DISCONNECT = const(0xE0)
+
+
+class My_socket_connection:
+    """
+    Adapter gniazda (usocket/socket) do interfejsu połączenia My_sim800l_connection (write, any, readinto, close).
+    *Pozwala uruchomić My_mqtt na Linuksie (np. port unix MicroPythona) z lokalnym brokerem testowym
+    """
+
+    def __init__(self, sock, timeout=5):
+        """
+        :param sock: Połączone gniazdo TCP: socket
+        :param timeout: Maksymalny czas[s] oczekiwania na dane w readinto: int or float
+        """
+        self.sock = sock
+        self.sock.settimeout(timeout)
+        self.poller = uselect.poll()
+        self.poller.register(sock, uselect.POLLIN)
+
+
+    def write(self, data):
+        return self.sock.send(data)
+
+
+    def any(self):
+        """
+        :return: Wartość różna od 0, jeśli są dane do odczytu: int
+        """
+        return 1 if self.poller.poll(0) else 0
+
+
+    def readinto(self, buf):
+        """
+        :return: Liczba odczytanych bajtów, 0 jeśli upłynął czas: int
+        """
+        try:
+            if(hasattr(self.sock, "recv_into")):
+                return self.sock.recv_into(buf)
+            return self.sock.readinto(buf) or 0
+        except OSError:
+            return 0
+
+
+    def close(self):
+        self.sock.close()
+
+
+
+class My_mqtt:
+    """
+    Klasa klienta MQTT 3.1.1 działającego na połączeniu TCP modułu sim800l.
+    *Jedno stałe połączenie utrzymywane pakietami PINGREQ (keepalive)
+    *Publikowanie z QoS 0 i QoS 1 (QoS 1 czeka na PUBACK)
+    *Wiadomości, których nie udało się wysłać lub potwierdzić, trafiają do kolejki na karcie SD
+     (lub w pamięci RAM, jeśli karta nie jest podana) i są wysyłane po ponownym połączeniu
+    *Po nieudanym połączeniu publish nie łączy się ponownie przez 'retry_interval' - wiadomości od razu trafiają
+     do kolejki (połączenie przez sim800l blokuje program nawet na 10s)
+    *Połączenie otwiera funkcja 'connect_fun' - zwraca np. My_sim800l_connection lub My_socket_connection,
+     np. lambda: sim.open_transparent_connection("broker", 1883) - obiekt z metodami write, any, readinto i close
+
+    *Test na Linuksie z lokalnym brokerem testowym: mqtt_fake_broker.py i mqtt_test.py
+
+    Przykładowa procedura:
+    1. Inicjalizacja
+    2. Połączenie z brokerem (connect)
+    3. Publikowanie wiadomości (publish)
+    4. Okresowe wywoływanie check() - keepalive i odbiór wiadomości
+    """
+
+    def __init__(self, client_id, connect_fun, user=None, password=None, keepalive=60, timeout=10,
+                 queue_dir=None, max_queue=50, retry_interval=60):
+        """
+        :param client_id: Identyfikator klienta: string
+        :param connect_fun: Funkcja otwierająca połączenie TCP z brokerem: function
+        :param user: Opcjonalna nazwa użytkownika: string
+        :param password: Opcjonalne hasło: string
+        :param keepalive: Czas[s] keepalive, 0 - wyłączony: int
+        :param timeout: Maksymalny czas[s] oczekiwania na odpowiedź brokera: int
+        :param queue_dir: Opcjonalna ścieżka do pliku kolejki na karcie SD, np. "/sd/mqtt_queue.bin": string
+        :param max_queue: Maksymalna liczba wiadomości w kolejce w pamięci RAM: int
+        :param retry_interval: Minimalny odstęp[s] między próbami połączenia przy publikowaniu: int
+        """
+        self.client_id = client_id
+        self.connect_fun = connect_fun
+        self.user = user
+        self.password = password
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self.queue_dir = queue_dir
+        self.max_queue = max_queue
+        self.retry_interval = retry_interval
+
+        self.conn = None
+        self.callback = None
+        self.queue = []             #kolejka w RAM, gdy nie ma karty SD
+        self._pid = 0
+        self._fail_ms = None        #czas ostatniej nieudanej próby połączenia
+        self._last_io = ticks_ms()
+        self._header = bytearray(5)
+        self._buf = bytearray(256)
+
+
+    def is_connected(self):
+        return self.conn is not None
+
+
+    def set_callback(self, callback):
+        """
+        :param callback: Funkcja wywoływana dla odebranych wiadomości: callback(topic, msg): function
+        """
+        self.callback = callback
+
+
+    def connect(self, clean_session=True):
+        """
+        Funkcja łącząca z brokerem i wysyłająca wiadomości z kolejki.
+
+        :param clean_session: Flaga 'clean session': bool
+        :return: 'True' jeśli broker przyjął połączenie, w przeciwnym wypadku 'False': bool
+        """
+        self.disconnect()
+        try:
+            self.conn = self.connect_fun()
+        except Exception as e:
+            print(e)
+            self.conn = None
+        if(not self.conn):
+            print("--Nie udalo sie polaczyc z brokerem MQTT--")
+            self.conn = None
+            self._fail_ms = ticks_ms()
+            return False
+
+        flags = 0x02 if clean_session else 0
+        payload = self._string(self.client_id)
+        if(self.user):
+            flags |= 0x80
+            payload += self._string(self.user)
+            if(self.password):
+                flags |= 0x40
+                payload += self._string(self.password)
+        variable = b"\x00\x04MQTT\x04" + bytes((flags,)) + ustruct.pack("!H", self.keepalive)
+
+        try:
+            self._send_packet(_CONNECT, variable + payload)
+            packet_type, length = self._read_packet()
+        except OSError as e:
+            print(e)
+            packet_type, length = None, 0
+
+        if(packet_type != _CONNACK or length != 2 or self._buf[1] != 0):
+            print("--Broker MQTT odrzucil polaczenie--")
+            self._drop()
+            self._fail_ms = ticks_ms()
+            return False
+
+        print("--Polaczono z brokerem MQTT--")
+        self._fail_ms = None
+        self.flush_queue()
+        return self.conn is not None        #połączenie mogło zostać zerwane w trakcie wysyłania kolejki
+
+
+    def disconnect(self):
+        """
+        Funkcja rozłączająca klienta od brokera.
+        """
+        if(self.conn):
+            try:
+                self.conn.write(bytes((_DISCONNECT, 0)))
+            except OSError:
+                pass
+            self._drop()
+
+
+    def publish(self, topic, msg, qos=0, retain=False):
+        """
+        Funkcja publikująca wiadomość, bez połączenia lub potwierdzenia wiadomość trafia do kolejki.
+        *Bez połączenia próbuje się połączyć, jeśli od ostatniej nieudanej próby minął 'retry_interval'
+
+        :param topic: Temat: string
+        :param msg: Treść wiadomości: string or bytes
+        :param qos: Poziom QoS: 0 lub 1: int
+        :param retain: Flaga 'retain': bool
+        :return: 'True' jeśli wiadomość została wysłana (i potwierdzona przy QoS 1), w przeciwnym wypadku 'False': bool
+        """
+        if(isinstance(msg, str)):
+            msg = msg.encode("utf-8")
+        if(not self.conn and not self._waiting()):
+            self.connect()
+        if(not self.conn):
+            self._enqueue(topic, msg, qos, retain)
+            return False
+        if(not self._publish(topic, msg, qos, retain)):
+            self._drop()
+            self._enqueue(topic, msg, qos, retain)
+            return False
+        return True
+
+
+    def _waiting(self):
+        """
+        :return: 'True' jeśli od ostatniej nieudanej próby połączenia nie minął jeszcze 'retry_interval': bool
+        """
+        return self._fail_ms is not None and ticks_diff(ticks_ms(), self._fail_ms) < self.retry_interval * 1000
+
+
+    def subscribe(self, topic, qos=0):
+        """
+        Funkcja subskrybująca temat - odebrane wiadomości trafiają do funkcji ustawionej w set_callback.
+
+        :param topic: Temat: string
+        :param qos: Maksymalny poziom QoS: int
+        :return: 'True' jeśli broker potwierdził subskrypcję, w przeciwnym wypadku 'False': bool
+        """
+        if(not self.conn):
+            return False
+        pid = self._next_pid()
+        try:
+            self._send_packet(_SUBSCRIBE, ustruct.pack("!H", pid) + self._string(topic) + bytes((qos,)))
+            return self._wait_for(_SUBACK, pid)
+        except OSError as e:
+            print(e)
+            self._drop()
+            return False
+
+
+    def check(self):
+        """
+        Funkcja do okresowego wywoływania - odbiera oczekujące wiadomości i wysyła PINGREQ po połowie czasu keepalive.
+        *Brak PINGRESP oznacza zerwane połączenie - przy następnej publikacji klient połączy się ponownie
+
+        :return: 'True' jeśli połączenie jest aktywne, w przeciwnym wypadku 'False': bool
+        """
+        if(not self.conn):
+            return False
+        try:
+            while(self.conn and self.conn.any()):
+                self._handle_packet(*self._read_packet())
+            if(self.keepalive and ticks_diff(ticks_ms(), self._last_io) >= self.keepalive * 500):
+                self._send_packet(_PINGREQ, b"")
+                if(not self._wait_for(_PINGRESP)):
+                    print("--Brak odpowiedzi brokera MQTT--")
+                    self._drop()
+        except OSError as e:
+            print(e)
+            self._drop()
+        return self.conn is not None
+
+
+    def flush_queue(self):
+        """
+        Funkcja wysyłająca wiadomości z kolejki (karta SD i RAM), niewysłane pozostają w kolejce.
+
+        :return: 'True' jeśli kolejka jest pusta, w przeciwnym wypadku 'False': bool
+        """
+        while(self.queue and self.conn):
+            if(not self._publish(*self.queue[0])):
+                self._drop()
+                return False
+            self.queue.pop(0)
+
+        if(not self.queue_dir or not self.conn):
+            return not self.queue
+        try:
+            f = open(self.queue_dir, "rb")
+        except OSError:
+            return True         #brak zaległych wiadomości
+
+        rest = None
+        record = self._read_record(f)
+        while(record):
+            if(not self._publish(*record)):
+                self._drop()
+                rest = record
+                break
+            record = self._read_record(f)
+
+        if(rest is None):
+            f.close()
+            uos.remove(self.queue_dir)
+            return True
+
+        # przepisanie niewysłanych wiadomości do nowego pliku
+        tmp_dir = self.queue_dir + ".tmp"
+        tmp = open(tmp_dir, "wb")
+        while(rest):
+            tmp.write(self._pack_record(*rest))
+            rest = self._read_record(f)
+        tmp.close()
+        f.close()
+        uos.remove(self.queue_dir)
+        uos.rename(tmp_dir, self.queue_dir)
+        return False
+
+
+    def _publish(self, topic, msg, qos, retain):
+        """
+        :return: 'True' jeśli wiadomość została wysłana (i potwierdzona przy QoS 1): bool
+        """
+        header = _PUBLISH | (qos << 1) | (1 if retain else 0)
+        variable = self._string(topic)
+        pid = 0
+        if(qos):
+            pid = self._next_pid()
+            variable += ustruct.pack("!H", pid)
+        try:
+            self._send_packet(header, variable, msg)
+            return not qos or self._wait_for(_PUBACK, pid)
+        except OSError as e:
+            print(e)
+            return False
+
+
+    def _enqueue(self, topic, msg, qos, retain):
+        """
+        Funkcja dodająca wiadomość do kolejki na karcie SD lub w RAM (najstarsze wiadomości są usuwane).
+        """
+        if(self.queue_dir):
+            try:
+                f = open(self.queue_dir, "ab")
+                f.write(self._pack_record(topic, msg, qos, retain))
+                f.close()
+                return
+            except OSError as e:
+                print(e)
+                print("Blad zapisu kolejki MQTT")
+        if(len(self.queue) >= self.max_queue):
+            self.queue.pop(0)
+        self.queue.append((topic, msg, qos, retain))
+
+
+    def _pack_record(self, topic, msg, qos, retain):
+        topic = topic.encode("utf-8")
+        return ustruct.pack("!BBHH", qos, 1 if retain else 0, len(topic), len(msg)) + topic + msg
+
+
+    def _read_record(self, f):
+        """
+        :return: Wiadomość z pliku kolejki (temat, treść, qos, retain) lub 'None' na końcu pliku: tuple
+        """
+        header = f.read(6)
+        if(not header or len(header) < 6):
+            return None
+        qos, retain, topic_len, msg_len = ustruct.unpack("!BBHH", header)
+        topic = f.read(topic_len).decode("utf-8")
+        msg = f.read(msg_len)
+        return (topic, msg, qos, retain == 1)
+
+
+    def _next_pid(self):
+        self._pid = self._pid % 65535 + 1
+        return self._pid
+
+
+    def _string(self, text):
+        if(isinstance(text, str)):
+            text = text.encode("utf-8")
+        return ustruct.pack("!H", len(text)) + text
+
+
+    def _send_packet(self, packet_type, variable, payload=b""):
+        """
+        Funkcja wysyłająca pakiet MQTT (nagłówek stały z długością jako varint).
+        """
+        length = len(variable) + len(payload)
+        header = self._header
+        header[0] = packet_type
+        i = 1
+        while(True):
+            byte = length & 0x7F
+            length >>= 7
+            header[i] = byte | (0x80 if length else 0)
+            i += 1
+            if(not length):
+                break
+        self.conn.write(memoryview(header)[:i])
+        if(variable):
+            self.conn.write(variable)
+        if(payload):
+            self.conn.write(payload)
+        self._last_io = ticks_ms()
+
+
+    def _read_exact(self, mv):
+        """
+        Funkcja odczytująca dokładnie len(mv) bajtów w czasie 'timeout'.
+        """
+        got = 0
+        t = ticks_ms()
+        while(got < len(mv)):
+            if(ticks_diff(ticks_ms(), t) >= self.timeout * 1000):
+                raise OSError(110)      #ETIMEDOUT
+            got += self.conn.readinto(mv[got:]) or 0
+
+
+    def _read_packet(self):
+        """
+        Funkcja odczytująca pakiet MQTT do bufora '_buf' (dłuższe treści są czytane do nowego bufora).
+
+        :return: (typ pakietu, długość danych): tuple(int, int)
+        """
+        header = memoryview(self._header)
+        self._read_exact(header[:1])
+        packet_type = self._header[0]
+
+        length = 0
+        shift = 0
+        while(True):
+            self._read_exact(header[1:2])
+            length |= (self._header[1] & 0x7F) << shift
+            shift += 7
+            if(not self._header[1] & 0x80):
+                break
+
+        if(length > len(self._buf)):
+            self._buf = bytearray(length)
+        self._read_exact(memoryview(self._buf)[:length])
+        self._last_io = ticks_ms()
+        return (packet_type, length)
+
+
+    def _wait_for(self, expected, pid=None):
+        """
+        Funkcja czekająca na pakiet danego typu (np. PUBACK), pozostałe pakiety są obsługiwane po drodze.
+
+        :return: 'True' jeśli pakiet został odebrany: bool
+        """
+        t = ticks_ms()
+        while(ticks_diff(ticks_ms(), t) < self.timeout * 1000):
+            packet_type, length = self._read_packet()
+            if(packet_type & 0xF0 == expected & 0xF0):
+                if(pid is None or ustruct.unpack("!H", self._buf[:2])[0] == pid):
+                    return True
+            else:
+                self._handle_packet(packet_type, length)
+        return False
+
+
+    def _handle_packet(self, packet_type, length):
+        """
+        Funkcja obsługująca pakiet odebrany poza oczekiwaniem na odpowiedź (PUBLISH od brokera).
+        """
+        if(packet_type & 0xF0 != _PUBLISH):
+            return
+        data = self._buf
+        topic_len = data[0] << 8 | data[1]
+        topic = bytes(data[2 : 2 + topic_len]).decode("utf-8")
+        pos = 2 + topic_len
+        qos = (packet_type >> 1) & 0x03
+        if(qos):
+            pid = data[pos] << 8 | data[pos + 1]
+            pos += 2
+            self._send_packet(_PUBACK, ustruct.pack("!H", pid))
+        if(self.callback):
+            self.callback(topic, bytes(data[pos : length]))
+
+
+    def _drop(self):
+        """
+        Funkcja zamykająca połączenie bez wysyłania DISCONNECT.
+        """
+        if(self.conn):
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+        self.conn = None
@@ -0,0 +1,120 @@
+from array import array
+from utime import ticks_ms, ticks_diff
+
+
+class My_scale_sampler:
+    """
+    Klasa sterująca próbkowaniem wagi - układ hx711 jest wyłączany między pomiarami.
+    *Gdy waga jest stabilna, pomiary są rzadkie (slow_interval)
+    *Gdy zmiana między pomiarami przekracza próg (np. rójka, miodobranie), pomiary są częste (fast_interval)
+    *Zlicza wykonane konwersje, czas pracy układu i szacowane zużycie energii
+    *Nie należy łączyć z pomiarami w tle (My_hx711.start_background)
+
+    Przykładowa procedura:
+    1. Inicjalizacja (waga po kalibracji)
+    2. Okresowe wywoływanie poll() w pętli głównej
+    3. Odczyt zużycia (report)
+    """
+
+    def __init__(self, scale, slow_interval=300, fast_interval=10, threshold_g=50, fast_hold=6, samples=4,
+                 active_ma=5, sleep_ua=1):
+        """
+        :param scale: Obiekt wagi po kalibracji: My_hx711
+        :param slow_interval: Odstęp[s] między pomiarami przy stabilnej wadze: int
+        :param fast_interval: Odstęp[s] między pomiarami przy zmianach wagi: int
+        :param threshold_g: Zmiana wagi[g] między pomiarami włączająca częste pomiary: int
+        :param fast_hold: Liczba stabilnych pomiarów, po której następuje powrót do rzadkich pomiarów: int
+        :param samples: Liczba konwersji uśrednianych w jednym pomiarze: int
+        :param active_ma: Prąd[mA] pobierany przez hx711 z belką w czasie pracy: int or float
+        :param sleep_ua: Prąd[uA] pobierany po wyłączeniu: int or float
+        """
+        self.scale = scale
+        self.slow_interval = slow_interval
+        self.fast_interval = fast_interval
+        self.threshold_mg = threshold_g * 1000
+        self.fast_hold = fast_hold
+        self.active_ma = active_ma
+        self.sleep_ua = sleep_ua
+
+        self._buf = array("i", [0] * (samples + 1))        #pierwsza konwersja po włączeniu jest odrzucana
+        self.fast = False
+        self._stable = 0
+        self._last_mg = None
+        self._last_ms = None
+        self._created_ms = ticks_ms()
+
+        self.conversions = 0        #wszystkie konwersje (także odrzucone)
+        self.readings = 0           #wykonane pomiary
+        self.awake_ms = 0           #łączny czas pracy układu
+
+        scale.power_off()
+
+
+    @property
+    def interval(self):
+        """
+        :return: Aktualny odstęp[s] między pomiarami: int
+        """
+        return self.fast_interval if self.fast else self.slow_interval
+
+
+    def poll(self):
+        """
+        Funkcja do wywoływania w pętli głównej - wykonuje pomiar, jeśli minął odstęp między pomiarami.
+
+        :return: Waga w g lub 'None' jeśli nie był to czas na pomiar lub pomiar się nie udał: float or None
+        """
+        if(self._last_ms is not None and ticks_diff(ticks_ms(), self._last_ms) < self.interval * 1000):
+            return None
+        weight = self.sample()
+        if(weight is False):
+            return None
+        return round(weight / 1000, 1)
+
+
+    def sample(self):
+        """
+        Funkcja wykonująca pomiar (włączenie układu, seria konwersji, wyłączenie) i dobierająca tryb próbkowania.
+
+        :return: Waga w mg lub 'False' jeśli pomiar się nie udał: int or bool
+        """
+        self._last_ms = ticks_ms()
+        self.scale.power_on()
+        count = self.scale.read_burst(self._buf)
+        self.scale.power_off()
+        self.awake_ms += ticks_diff(ticks_ms(), self._last_ms)
+        self.conversions += count
+
+        if(count < 2):
+            return False
+        total = 0
+        for i in range(1, count):
+            total += self._buf[i]
+        weight = self.scale.raw_to_mg(total // (count - 1))
+        self.readings += 1
+
+        if(self._last_mg is not None and abs(weight - self._last_mg) > self.threshold_mg):
+            if(not self.fast):
+                print("--Szybkie probkowanie wagi--")
+            self.fast = True
+            self._stable = 0
+        elif(self.fast):
+            self._stable += 1
+            if(self._stable >= self.fast_hold):
+                print("--Wolne probkowanie wagi--")
+                self.fast = False
+        self._last_mg = weight
+        return weight
+
+
+    def report(self):
+        """
+        :return: Zużycie od utworzenia obiektu - liczba konwersji i pomiarów, czas pracy[ms],
+                 czas wyłączenia[ms], szacowana energia[uAh], tryb: dictionary
+        """
+        total_ms = ticks_diff(ticks_ms(), self._created_ms)
+        sleep_ms = max(total_ms - self.awake_ms, 0)
+        energy_uah = (self.active_ma * self.awake_ms + self.sleep_ua * sleep_ms / 1000) / 3600
+        return {"conversions": self.conversions, "readings": self.readings, "awake_ms": self.awake_ms,
+                "sleep_ms": sleep_ms, "energy_uah": round(energy_uah, 2),
+                "mode": "fast" if self.fast else "slow", "interval": self.interval}
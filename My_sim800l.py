@@ -1,13 +1,318 @@
 import select
 import sys
 from machine import UART, Pin
-from utime import ticks_ms
+from utime import ticks_ms, ticks_diff, sleep_ms
 from time import sleep
+from micropython import const
+from My_http import My_http_response
 
 # Konfiguracja sim800l:
 # - na stałe włączone pobieranie czasu z serwera UTC
 # - na stałe wyłączona dioda led w module
 
+
+def build_http_request(method, server, headers, path, data, json):
+    """
+    Funkcja budująca treść zapytania http
+    *dane "json" nadpisują dane "data" i automatycznie dodają odpowiedni nagłówek http
+
+    :return: Zapytanie http gotowe do wysłania: string
+    """
+    header = "Host: " + server + "\r\n"
+    for h in headers:
+        header = header + h + ": " + headers[h] + "\r\n"
+
+    data_to_send = ""
+    if (json):
+        if (header.find("Content-Type: application/json") < 0):
+            header = header + "Content-Type: application/json\r\n"
+        data_to_send = json
+    else:
+        data_to_send = data
+
+    return method + " " + path + " HTTP/1.1\r\n" + header + "\r\n" + data_to_send
+
+
+def is_http_response_complete(resp):
+    """
+    Funkcja sprawdzająca czy odpowiedź http (po 'SEND OK') została odebrana w całości.
+    *Obsługuje nagłówek 'Content-Length' oraz 'Transfer-Encoding: chunked'
+
+    :param resp: Dotychczas odczytana odpowiedź modułu: bytes or My_rx_buffer
+    :return: 'True' jeśli odpowiedź jest kompletna, w przeciwnym wypadku 'False': bool
+    """
+    start = resp.find(b"SEND OK")
+    if(start < 0):
+        return False
+    header_end = resp.find(b"\r\n\r\n", start + 9)
+    if(header_end < 0):
+        return False
+
+    index = resp.find(b"Content-Length:", start, header_end)
+    if(index < 0):
+        index = resp.find(b"content-length:", start, header_end)
+    if(index >= 0):
+        length, _ = parse_int(resp, index + 15)
+        return length is not None and len(resp) - (header_end + 4) >= length
+    if(resp.find(b"chunked", start, header_end) >= 0):
+        return resp.endswith(b"\r\n0\r\n\r\n")
+    # bez długości treści - koniec wyznacza zamknięcie połączenia
+    return False
+
+
+def parse_int(resp, pos):
+    """
+    Funkcja odczytująca nieujemną liczbę całkowitą z odpowiedzi bez tworzenia pośrednich napisów.
+    *Pomija spacje przed liczbą
+
+    :param resp: Odpowiedź modułu: bytes or My_rx_buffer
+    :param pos: Pozycja początku liczby: int
+    :return: (liczba lub 'None', pozycja za liczbą): tuple(int, int)
+    """
+    end = len(resp)
+    while(pos < end and resp[pos] == 32):
+        pos += 1
+    value = None
+    while(pos < end and 48 <= resp[pos] <= 57):
+        value = (value or 0) * 10 + resp[pos] - 48
+        pos += 1
+    return (value, pos)
+
+
+def parse_sim_status(resp):
+    """
+    Funkcja odczytująca status karty SIM z odpowiedzi na 'AT+CPIN?'
+
+    :param resp: Odpowiedź modułu: bytes or My_rx_buffer
+    :return: 'READY', 'SIM PIN', 'SIM PUK' lub 'ERROR': string
+    """
+    if (resp.find(b"READY") >= 0):
+        return "READY"
+    elif(resp.find(b"SIM PIN") >= 0):
+        return "SIM PIN"
+    elif (resp.find(b"SIM PUK") >= 0):
+        return "SIM PUK"
+    else:
+        return "ERROR"
+
+
+def parse_voltage(resp):
+    """
+    Funkcja odczytująca napięcie z odpowiedzi na 'AT+CBC' (+CBC: <stan>,<poziom>,<napięcie>)
+
+    :param resp: Odpowiedź modułu: bytes or My_rx_buffer
+    :return: Napięcie w mV lub 'False' jeśli odpowiedź jest niepoprawna: int or bool
+    """
+    index = resp.find(b"+CBC:")
+    if(index < 0):
+        return False
+    pos = index + 5
+    for i in range(2):
+        value, pos = parse_int(resp, pos)
+        if(value is None or pos >= len(resp) or resp[pos] != 44):     #','
+            return False
+        pos += 1
+    voltage, pos = parse_int(resp, pos)
+    return False if voltage is None else voltage
+
+
+def parse_utc_time(resp):
+    """
+    Funkcja odczytująca czas z odpowiedzi na 'AT+CCLK?' (+CCLK: "rr/mm/dd,hh:mm:ss+zz")
+
+    :param resp: Odpowiedź modułu: bytes or My_rx_buffer
+    :return: Czas (rr/mm/dd, hh:mm:ss) lub 'False' jeśli odpowiedź jest niepoprawna: tuple(string, string) or bool
+    """
+    index = resp.find(b"+CCLK:")
+    if(index < 0 or resp.find(b"OK", index) < 0):
+        return False
+    start = resp.find(b'"', index)
+    comma = resp.find(b",", start)
+    if(start < 0 or comma < 0 or comma + 9 > len(resp)):
+        return False
+    return (resp[start + 1 : comma].decode("utf-8"), resp[comma + 1 : comma + 9].decode("utf-8"))
+
+
+def parse_signal_strength(resp):
+    """
+    Funkcja odczytująca siłę sygnału z odpowiedzi na 'AT+CSQ' (+CSQ: <rssi>,<ber>)
+
+    :param resp: Odpowiedź modułu: bytes or My_rx_buffer
+    :return: Siła sygnału 0-31 (99 - nieznana) lub 'False' jeśli odpowiedź jest niepoprawna: int or bool
+    """
+    index = resp.find(b"+CSQ:")
+    if(index < 0 or resp.find(b"OK", index) < 0):
+        return False
+    signal, _ = parse_int(resp, index + 5)
+    return False if signal is None else signal
+
+
+
+class My_rx_buffer:
+    """
+    Bufor cykliczny na odpowiedzi modułu sim800l.
+    *Dane z UART są czytane przez readinto do wstępnie zaalokowanego bufora - bez tworzenia nowych obiektów
+    *Pozycje są liczone od ostatniego wyczyszczenia bufora (clear), po przepełnieniu najstarsze dane są nadpisywane
+     i ustawiana jest flaga 'overflow'
+    *Udostępnia find, endswith, indeksowanie i wycinki jak 'bytes' - wycinek tworzy nowy obiekt,
+     dlatego należy go używać tylko dla pól zwracanych użytkownikowi
+    """
+
+    def __init__(self, size):
+        """
+        :param size: Rozmiar bufora w bajtach: int
+        """
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.size = size
+        self.end = 0            #pozycja za ostatnim odebranym bajtem
+        self.length = 0         #liczba bajtów dostępnych w buforze
+        self.terminator = -1    #pozycja linii kończącej odpowiedź, -1 jeśli nie znaleziono
+        self.overflow = False   #najstarsze dane zostały nadpisane
+
+
+    def clear(self):
+        self.end = 0
+        self.length = 0
+        self.terminator = -1
+        self.overflow = False
+
+
+    def begin(self):
+        """
+        :return: Pozycja najstarszego bajtu dostępnego w buforze: int
+        """
+        return self.end - self.length
+
+
+    def fill(self, uart):
+        """
+        Funkcja dopisująca do bufora dane dostępne w UART (bez czekania).
+
+        :param uart: Interfejs UART: UART
+        :return: Liczba odczytanych bajtów: int
+        """
+        available = uart.any()
+        if(not available):
+            return 0
+        head = self.end % self.size
+        n = uart.readinto(self.mv[head:], min(available, self.size - head))
+        if(not n):
+            return 0
+        self.end += n
+        if(self.length + n > self.size):
+            self.overflow = True
+        self.length = min(self.length + n, self.size)
+        return n
+
+
+    def __len__(self):
+        return self.end
+
+
+    def __getitem__(self, index):
+        if(isinstance(index, slice)):
+            start = self.begin() if index.start is None else max(index.start, self.begin())
+            stop = self.end if index.stop is None else min(index.stop, self.end)
+            if(start >= stop):
+                return b""
+            head = start % self.size
+            tail = stop % self.size
+            if(head < tail or tail == 0):
+                return bytes(self.mv[head : tail if tail else self.size])
+            return bytes(self.mv[head:]) + bytes(self.mv[:tail])
+
+        if(index < self.begin() or index >= self.end):
+            raise IndexError
+        return self.buf[index % self.size]
+
+
+    def startswith(self, prefix, pos):
+        """
+        :return: 'True' jeśli dane od pozycji 'pos' zaczynają się od 'prefix': bool
+        """
+        if(pos < self.begin() or pos + len(prefix) > self.end):
+            return False
+        buf = self.buf
+        size = self.size
+        for i in range(len(prefix)):
+            if(buf[(pos + i) % size] != prefix[i]):
+                return False
+        return True
+
+
+    def endswith(self, suffix):
+        return self.startswith(suffix, self.end - len(suffix))
+
+
+    def find(self, pattern, start=None, end=None):
+        """
+        Funkcja wyszukująca ciąg bajtów w buforze (jak bytes.find).
+
+        :return: Pozycja początku ciągu lub -1: int
+        """
+        if(start is None or start < self.begin()):
+            start = self.begin()
+        if(end is None or end > self.end):
+            end = self.end
+        first = pattern[0]
+        buf = self.buf
+        size = self.size
+        for pos in range(start, end - len(pattern) + 1):
+            if(buf[pos % size] == first and self.startswith(pattern, pos)):
+                return pos
+        return -1
+
+
+    def copy_into(self, buf, start, stop):
+        """
+        Funkcja kopiująca dane z bufora do 'buf' bez tworzenia pośrednich obiektów.
+
+        :param buf: Bufor docelowy: bytearray or memoryview
+        :param start: Pozycja początku danych: int
+        :param stop: Pozycja końca danych: int
+        :return: Liczba skopiowanych bajtów: int
+        """
+        start = max(start, self.begin())
+        stop = min(stop, self.end, start + len(buf))
+        copied = 0
+        while(start < stop):
+            head = start % self.size
+            n = min(stop - start, self.size - head)
+            buf[copied : copied + n] = self.mv[head : head + n]
+            copied += n
+            start += n
+        return copied
+
+
+    def scan_lines(self, pos, prefixes):
+        """
+        Funkcja sprawdzająca pełne linie od pozycji 'pos' - szuka linii zaczynającej się od jednego z 'prefixes'.
+        *Znalezioną pozycję zapisuje w 'terminator'
+
+        :param pos: Pozycja początku pierwszej niesprawdzonej linii: int
+        :param prefixes: Prefiksy linii: tuple
+        :return: Pozycja początku pierwszej niesprawdzonej linii: int
+        """
+        buf = self.buf
+        size = self.size
+        if(pos < self.begin()):
+            pos = self.begin()
+        for i in range(pos, self.end):
+            if(buf[i % size] != 10):       #'\n'
+                continue
+            # pominięcie białych znaków na początku linii
+            while(pos < i and buf[pos % size] in (13, 32)):
+                pos += 1
+            for prefix in prefixes:
+                if(self.startswith(prefix, pos)):
+                    self.terminator = pos
+                    return i + 1
+            pos = i + 1
+        return pos
+
+
+
 class My_sim800l:
     """
     Klasa odpowiedzialna za obsługę modułu sim800l.
@@ -21,13 +326,23 @@ class My_sim800l:
     4. Połączenie z APN'em
     5. Wysłanie zapytania http
     """
-    def __init__(self, sleep_pin, uart=2, baudrate=115200, rx=16, tx=17, rxbuf=1024):
+
+    # Kody kończące odpowiedź modułu na polecenie AT
+    FINAL_RESPONSES = (b"OK", b"ERROR", b"+CME ERROR", b"SEND OK", b"CONNECT OK", b"CLOSED")
+
+    # Metody obsługiwane przez wbudowany stos http modułu (AT+HTTPACTION)
+    HTTP_ACTIONS = {"GET": 0, "POST": 1, "HEAD": 2, "DELETE": 3}
+
+    def __init__(self, sleep_pin, uart=2, baudrate=115200, rx=16, tx=17, rxbuf=1024, respbuf=1024, status_pin=None):
         """
         :param sleep_pin: Numer pinu DTR - sim800l
         :param uart: Numer interfejsu UART: int
         :param baudrate: Prędkość transmisji
         :param rx: Numer pinu rx
         :param tx: Numer pinu tx
+        :param rxbuf: Rozmiar bufora odbiorczego UART: int
+        :param respbuf: Rozmiar bufora na odpowiedzi modułu (My_rx_buffer): int
+        :param status_pin: Opcjonalny numer pinu podłączonego do wyjścia STATUS - sim800l: int
         """
         self.uart_num = uart
         self.baudrate = baudrate
@@ -36,12 +351,22 @@ class My_sim800l:
         self.rxbuf = rxbuf
         self.sleep_pin = Pin(sleep_pin, Pin.OUT)
         self.led = Pin(27, Pin.OUT)#<------------------------------- LED DO DEBUGOWANIA
+        self.status_pin = Pin(status_pin, Pin.IN) if status_pin is not None else None
 
         self.uart = UART(self.uart_num, baudrate=self.baudrate, rx=self.rx, tx=self.tx, rxbuf=self.rxbuf)
 
+        self.resp = My_rx_buffer(respbuf)
+        self._tcp_host = None       #(serwer, port) otwartego połączenia TCP
+        self._bearer_open = False   #kontekst GPRS dla wbudowanego stosu http (AT+SAPBR)
+        self.http_transport = "tcp"
+
+        self.apn_name = ""
+        self.apn_user = ""
+        self.apn_pass = ""
+
         self.sleep_pin.value(0)
 
-        self._ping(3)
+        self._ping(6)
 
 
 
@@ -49,12 +374,35 @@ class My_sim800l:
     def _ping(self, num_of_pings):
         """
         Funkcja pingująca układ sim800l w celu obudzenia lub dostosowania prędkości transmisji.
+        Kończy się, gdy moduł odpowie 'OK' (maksymalnie 'num_of_pings' prób po 0,5s).
+
+        :param num_of_pings: Maksymalna liczba prób: int
+        :return: 'True' jeśli moduł odpowiedział, w przeciwnym wypadku 'False': bool
         """
         for i in range(num_of_pings):
-            self._send_data("AT\n")
-            sleep(0.5)
             print("Ping: " + str(i+1))
-        self._read_data(0.5)
+            if(self._send_command("AT\n", 0.5)):
+                return True
+        return False
+
+
+
+    def _wait_status(self, value, timeout):
+        """
+        Funkcja czekająca na stan pinu STATUS (jeśli został podany).
+
+        :param value: Oczekiwany stan pinu: int
+        :param timeout: Maksymalny czas[s] oczekiwania: int or float
+        :return: 'True' jeśli pin ma oczekiwany stan lub nie został podany, w przeciwnym wypadku 'False': bool
+        """
+        if(self.status_pin is None):
+            return True
+        t = ticks_ms()
+        while(self.status_pin.value() != value):
+            if(ticks_diff(ticks_ms(), t) >= timeout * 1000):
+                return False
+            sleep_ms(10)
+        return True
 
 
 
@@ -95,6 +443,50 @@ class My_sim800l:
 
 
 
+    def _read_response(self, timeout=1, terminators=None, is_complete=None):
+        """
+        Funkcja odczytująca odpowiedź modułu na polecenie AT do bufora 'self.resp'.
+        Czyta dane z interfejsu UART do momentu otrzymania linii zaczynającej się od jednego z 'terminators'
+        (lub znaku zachęty '> ', jeśli jest na liście) albo do upłynięcia czasu 'timeout'.
+        *Komunikat 'CLOSED' w odpowiedzi oznacza, że połączenie TCP zostało zamknięte
+
+        :param timeout: Maksymalny czas[s] oczekiwania na odpowiedź: int or float
+        :param terminators: Prefiksy linii kończących odpowiedź, domyślnie FINAL_RESPONSES: tuple
+        :param is_complete: Opcjonalna funkcja sprawdzająca kompletność odpowiedzi (np. http): function
+        :return: Bufor z odpowiedzią, pozycja linii kończącej w 'terminator',
+                 'overflow' jeśli odpowiedź nie zmieściła się w buforze: My_rx_buffer
+        """
+        if(terminators is None):
+            terminators = self.FINAL_RESPONSES
+
+        resp = self.resp
+        resp.clear()
+        prompt = b">" in terminators
+        line = 0
+        t = ticks_ms()
+        while(ticks_diff(ticks_ms(), t) < timeout * 1000):
+            if(not resp.fill(self.uart)):
+                sleep_ms(5)
+                continue
+            if(resp.overflow):
+                break           #początek odpowiedzi został nadpisany
+
+            if(prompt and resp.endswith(b"> ")):
+                resp.terminator = resp.end - 2
+                break
+            line = resp.scan_lines(line, terminators)
+            if(resp.terminator >= 0):
+                break
+            if(is_complete and is_complete(resp)):
+                resp.terminator = resp.end
+                break
+
+        if(resp.find(b"CLOSED\r\n") >= 0):
+            self._tcp_host = None
+        return resp
+
+
+
     def _send_data(self, data):
         """
         Funkcja wysyłająca dane przez UART.
@@ -117,16 +509,9 @@ class My_sim800l:
         :return: Status karty sim: string
         """
         self._send_data("AT+CPIN?\n")
-        resp = self._read_data(0.2)
+        resp = self._read_response(1)
         #print(resp)
-        if (resp.find("READY") > 0):
-            return "READY"
-        elif(resp.find("SIM PIN") > 0):
-            return "SIM PIN"
-        elif (resp.find("SIM PUK") > 0):
-            return "SIM PUK"
-        else:
-            return "ERROR"
+        return parse_sim_status(resp)
 
 
 
@@ -139,9 +524,10 @@ class My_sim800l:
         """
         print("--Odblokowywanie karty SIM--")
         self._send_data('AT+CPIN="' + str(pin) + '"\n')
-        resp = self._read_data(10)
+        # po odblokowaniu czekamy aż karta będzie gotowa ('SMS Ready')
+        resp = self._read_response(10, (b"SMS Ready", b"ERROR", b"+CME ERROR"))
         #print(resp)
-        if(resp.find("OK") > 0):
+        if(resp.find(b"OK") >= 0):
             return True
         else:
             return False
@@ -158,30 +544,34 @@ class My_sim800l:
         :return: Przydzielony adres IPv4 lub 'False' gdy błąd: string or bool
         """
         if(apn_name and apn_user and apn_pass):
-            self._send_data('AT+CSTT="' + apn_name + '","' + apn_user + '","' + apn_pass + '"\n')
-        else:
-            self._send_data('AT+CSTT="' + self.apn_name + '","' + self.apn_user + '","' + self.apn_pass + '"\n')
+            self.apn_name = apn_name
+            self.apn_user = apn_user
+            self.apn_pass = apn_pass
 
-        resp = self._read_data(0.2)
+        self._send_data('AT+CSTT="' + self.apn_name + '","' + self.apn_user + '","' + self.apn_pass + '"\n')
+
+        resp = self._read_response(1)
         #print(resp)
-        if (resp.find("OK") > 0):
+        if (resp.find(b"OK") >= 0):
             print("--Zapisano konfiguracje APN'a--")
 
             self._send_data("AT+CIICR\n")
 
-            resp = self._read_data(0.8)
-            if (resp.find("OK") > 0):
+            resp = self._read_response(10)
+            if (resp.find(b"OK") >= 0):
                 print("--Uruchomiono GPRS--")
 
                 self._send_data("AT+CIFSR\n")
 
-                resp = self._read_data(0.2)
-                if(resp.find("ERROR") > 0):
+                # AT+CIFSR nie kończy się 'OK' - odpowiedzią jest sam adres IP (zaczyna się od cyfry)
+                resp = self._read_response(1, (b"ERROR", b"0", b"1", b"2", b"3", b"4", b"5", b"6", b"7", b"8", b"9"))
+                if(resp.terminator < 0 or resp.startswith(b"ERROR", resp.terminator)):
                     print("--Nie uzyskano adresu IP--")
                     return False
                 else:
-                    print(resp[10 : -1])
-                    return resp[10 : -1]        #zwrócenie przydzielonego adresu IPv4
+                    ip = resp[resp.terminator : resp.find(b"\r", resp.terminator)].decode("utf-8")
+                    print(ip)
+                    return ip        #zwrócenie przydzielonego adresu IPv4
             else:
                 print("--Nie udalo sie uruchomic GPRS--")
                 return False
@@ -191,10 +581,17 @@ class My_sim800l:
 
 
 
-    def send_http_request(self, method, server, headers={}, path="/", data="", json="", port=80):
+    def send_http_request(self, method, server, headers={}, path="/", data="", json="", port=80, keep_alive=False,
+                          stream=False):
         """
         Funkcja wysyłająca zapytania http
         *dane "json" nadpisują dane "data" i automatycznie dodają odpowiedni nagłówek http
+        *przy 'keep_alive' połączenie TCP pozostaje otwarte i jest używane ponownie przy kolejnych
+         zapytaniach do tego samego serwera, dopóki moduł nie zgłosi 'CLOSED'
+        *przy 'stream' zwracany jest obiekt My_http_response (status, nagłówki, treść czytana fragmentami),
+         który należy zamknąć (close) przed wysłaniem kolejnego polecenia
+        *sposób wysyłania wybiera set_http_transport - przy transporcie "http" zwracana jest sama treść odpowiedzi,
+         a przy 'stream' obiekt My_sim800l_http_response ('keep_alive' jest pomijane)
 
         :param method: Metoda zapytania http: GET, POST, PUT, DELETE: string
         :param server: Serwer do którego ma zostać wysłane zapytanie: string
@@ -203,38 +600,256 @@ class My_sim800l:
         :param data: Treść zapytania jako tekst: string
         :param json: Treść zapytania w formacie json: string
         :param port: port - domyślnie: 80: int
+        :param keep_alive: Utrzymanie połączenia TCP po otrzymaniu odpowiedzi - domyślnie: 'False': bool
+        :param stream: Zwrócenie odpowiedzi jako My_http_response - domyślnie: 'False': bool
+        :return: Odpowiedź serwera lub 'False' gdy błąd (także gdy odpowiedź nie mieści się w buforze 'respbuf' -
+                 wtedy należy użyć 'stream'): string or My_http_response or bool
         """
-        #przygotowanie zapytania http
-        header = "Host: " + server + "\r\n"
+        if(self.http_transport == "http"):
+            return self._send_http_native(method, server, headers, path, data, json, port, stream)
+
+        if(keep_alive and "Connection" not in headers):
+            headers = dict(headers)
+            headers["Connection"] = "keep-alive"
+
+        request = build_http_request(method, server, headers, path, data, json)
+
+        if(not self._open_connection(server, port, keep_alive)):
+            print("--Blad polaczenia z serwerem--")
+            return False
+
+        self._send_data('AT+CIPSEND=' + str(len(request)) + "\n")
+        resp = self._read_response(5, (b">", b"ERROR"))
+        if(not resp.endswith(b"> ")):
+            print("--Modul nie przyjal danych do wyslania--")
+            return False
+
+        self._send_data(request)
+        if(stream):
+            return My_http_response(self.uart, 10, on_close=None if keep_alive else self._end_connection)
+
+        resp = self._read_response(10, (b"CLOSED", b"SEND FAIL"), is_http_response_complete)
+        if(resp.overflow):
+            print("--Odpowiedz serwera wieksza niz bufor odpowiedzi (respbuf), uzyj stream=True--")
+            self._discard_input()
+            self.close_connection()         #reszta odpowiedzi jest bezużyteczna
+            return False
+
+        start = resp.find(b"SEND OK")
+        end = resp.end - 8 if resp.endswith(b"CLOSED\r\n") else resp.end
+        #wycinamy echo i napis CLOSED z odpowiedzi
+        body = resp[start + 9 : end].decode("utf-8") if start >= 0 else ""
+
+        if(not keep_alive):
+            self._end_connection()
+        return body
+
+
+
+    def set_http_transport(self, transport):
+        """
+        Funkcja wybierająca sposób wysyłania zapytań http w send_http_request:\n
+        "tcp" - zapytanie budowane ręcznie i wysyłane przez AT+CIPSEND (domyślnie)\n
+        "http" - wbudowany stos http modułu (AT+HTTPINIT/HTTPPARA/HTTPACTION/HTTPREAD)
+
+        :param transport: "tcp" lub "http": string
+        """
+        if(transport not in ("tcp", "http")):
+            raise ValueError("Nieznany transport http: " + str(transport))
+        self.http_transport = transport
+
+
+
+    def _send_command(self, cmd, timeout=1, terminators=None):
+        """
+        Funkcja wysyłająca polecenie AT i sprawdzająca czy moduł odpowiedział 'OK'.
+
+        :return: 'True' jeśli moduł odpowiedział 'OK', w przeciwnym wypadku 'False': bool
+        """
+        self._send_data(cmd)
+        resp = self._read_response(timeout, terminators)
+        return resp.terminator >= 0 and resp.startswith(b"OK", resp.terminator)
+
+
+
+    def _open_bearer(self):
+        """
+        Funkcja otwierająca kontekst GPRS dla wbudowanego stosu http (AT+SAPBR).
+
+        :return: 'True' jeśli kontekst jest otwarty, w przeciwnym wypadku 'False': bool
+        """
+        if(self._bearer_open):
+            return True
+
+        self._send_command('AT+SAPBR=3,1,"Contype","GPRS"\n')
+        if(self.apn_name):
+            self._send_command('AT+SAPBR=3,1,"APN","' + self.apn_name + '"\n')
+            self._send_command('AT+SAPBR=3,1,"USER","' + self.apn_user + '"\n')
+            self._send_command('AT+SAPBR=3,1,"PWD","' + self.apn_pass + '"\n')
+        self._send_command("AT+SAPBR=1,1\n", 30)      #'ERROR' jeśli kontekst był już otwarty
+
+        # +SAPBR: <cid>,<stan>,"<ip>" - stan 1 oznacza otwarty kontekst
+        self._send_data("AT+SAPBR=2,1\n")
+        resp = self._read_response(1)
+        index = resp.find(b"+SAPBR:")
+        if(index >= 0):
+            _, pos = parse_int(resp, index + 7)
+            state, _ = parse_int(resp, pos + 1)
+            self._bearer_open = state == 1
+
+        if(not self._bearer_open):
+            print("--Nie udalo sie otworzyc kontekstu GPRS--")
+        return self._bearer_open
+
+
+
+    def _send_http_native(self, method, server, headers, path, data, json, port, stream):
+        """
+        Funkcja wysyłająca zapytanie http przez wbudowany stos http modułu (parametry jak w send_http_request).
+
+        :return: Treść odpowiedzi lub 'False' gdy błąd: string or My_sim800l_http_response or bool
+        """
+        if(method not in self.HTTP_ACTIONS):
+            print("--Metoda " + method + " nie jest obslugiwana przez modul--")
+            return False
+        if(not self._open_bearer()):
+            return False
+
+        content_type = "application/json" if json else ""
+        user_data = ""
         for h in headers:
-            header = header + h + ": " + headers[h] + "\r\n"
+            if(h == "Content-Type"):
+                content_type = headers[h]
+            elif(h not in ("Host", "Content-Length", "Connection")):
+                user_data = user_data + ("\\r\\n" if user_data else "") + h + ": " + headers[h]
+
+        self._send_command("AT+HTTPTERM\n")       #zamknięcie poprzedniej sesji, jeśli została otwarta
+        ok = self._send_command("AT+HTTPINIT\n") and \
+             self._send_command('AT+HTTPPARA="CID",1\n') and \
+             self._send_command('AT+HTTPPARA="URL","' + server + ':' + str(port) + path + '"\n')
+        if(ok and content_type):
+            ok = self._send_command('AT+HTTPPARA="CONTENT","' + content_type + '"\n')
+        if(ok and user_data):
+            ok = self._send_command('AT+HTTPPARA="USERDATA","' + user_data + '"\n')
+
+        body = json if json else data
+        if(ok and body):
+            self._send_data("AT+HTTPDATA=" + str(len(body)) + ",10000\n")
+            resp = self._read_response(5, (b"DOWNLOAD", b"ERROR"))
+            ok = resp.terminator >= 0 and resp.startswith(b"DOWNLOAD", resp.terminator)
+            if(ok):
+                self._send_data(body)
+                ok = self._read_response(11).find(b"OK") >= 0
+
+        if(not ok):
+            print("--Nie udalo sie przygotowac zapytania http--")
+            self._send_command("AT+HTTPTERM\n")
+            return False
+
+        # +HTTPACTION: <metoda>,<status>,<długość treści>
+        self._send_data("AT+HTTPACTION=" + str(self.HTTP_ACTIONS[method]) + "\n")
+        resp = self._read_response(30, (b"+HTTPACTION:", b"ERROR"))
+        index = resp.find(b"+HTTPACTION:")
+        if(index < 0):
+            print("--Blad polaczenia z serwerem--")
+            self._send_command("AT+HTTPTERM\n")
+            return False
+        _, pos = parse_int(resp, index + 12)
+        status, pos = parse_int(resp, pos + 1)
+        length, _ = parse_int(resp, pos + 1)
+
+        response = My_sim800l_http_response(self, status, length or 0)
+        if(stream):
+            return response
+        text = response.text()
+        response.close()
+        return text
+
 
-        data_to_send = ""
-        if (json):
-            if (header.find("Content-Type: application/json") < 0):
-                header = header + "Content-Type: application/json\r\n"
-            data_to_send = json
-        else:
-            data_to_send = data
 
-        request = method + " " + path + " HTTP/1.1\r\n" + header + "\r\n" + data_to_send
+    def _open_connection(self, server, port, reuse=False):
+        """
+        Funkcja otwierająca połączenie TCP z serwerem.
+
+        :param server: Adres serwera: string
+        :param port: Port: int
+        :param reuse: Użycie już otwartego połączenia z tym samym serwerem: bool
+        :return: 'True' jeśli połączenie jest otwarte, w przeciwnym wypadku 'False': bool
+        """
+        if(reuse and self._tcp_host == (server, port) and self.get_connection_status() == "CONNECT OK"):
+            return True
+        if(self._tcp_host):
+            self.close_connection()
 
         self._send_data('AT+CIPSTART="TCP"' + ',"' + server + '",' + str(port) + "\n")
 
-        resp = self._read_data(2)
-        if(resp.find("CONNECT OK") > 0):
+        resp = self._read_response(10, (b"CONNECT OK", b"CONNECT FAIL", b"ALREADY CONNECT", b"ERROR"))
+        if(resp.find(b"CONNECT OK") >= 0):
             print("--Polaczono z: " + server + "--")
+            self._tcp_host = (server, port)
+            return True
+        return False
 
-            self._send_data('AT+CIPSEND=' + str(len(request)) + "\n")
-            sleep(0.1)
-            self._send_data(request)
-            resp = self._read_data(10)
 
-            return resp[resp.find("SEND OK")+9 : -8]       #wycinamy echo i napis CLOSED z odpowiedzi
-        else:
-            print("--Blad polaczenia z serwerem--")
+
+    def _discard_input(self, idle=1, timeout=10):
+        """
+        Funkcja odrzucająca dane napływające z UART, aż przez 'idle' sekund nie będzie nowych danych.
+
+        :param idle: Czas[s] bez nowych danych: int or float
+        :param timeout: Maksymalny czas[s] odrzucania: int or float
+        """
+        resp = self.resp
+        t = ticks_ms()
+        last = t
+        while(ticks_diff(ticks_ms(), last) < idle * 1000 and ticks_diff(ticks_ms(), t) < timeout * 1000):
+            resp.clear()
+            if(resp.fill(self.uart)):
+                last = ticks_ms()
+            else:
+                sleep_ms(5)
+
+
+
+    def _end_connection(self):
+        """
+        Funkcja zamykająca połączenie TCP, jeśli serwer nie zamknął go sam.
+        """
+        if(self._tcp_host):
+            self.close_connection()
+
+
+
+    def get_connection_status(self):
+        """
+        Funkcja odczytująca stan połączenia TCP (AT+CIPSTATUS), np. 'IP INITIAL', 'CONNECT OK', 'TCP CLOSED'.
+
+        :return: Stan połączenia lub 'False' gdy błąd: string or bool
+        """
+        self._send_data("AT+CIPSTATUS\n")
+        resp = self._read_response(1, (b"STATE:", b"ERROR"))
+        index = resp.find(b"STATE:")
+        if(index < 0):
             return False
 
+        state = resp[index + 7 : resp.find(b"\r", index)].decode("utf-8")
+        if(state != "CONNECT OK"):
+            self._tcp_host = None
+        return state
+
+
+
+    def close_connection(self):
+        """
+        Funkcja zamykająca połączenie TCP.
+
+        :return: 'True' jeśli się uda, w przeciwnym razie 'False': bool
+        """
+        self._send_data("AT+CIPCLOSE\n")
+        resp = self._read_response(2, (b"CLOSE OK", b"ERROR"))
+        self._tcp_host = None
+        return resp.find(b"CLOSE OK") >= 0
+
 
     def get_voltage(self):
         """
@@ -243,21 +858,12 @@ class My_sim800l:
         :return: Jeśli uda się odczytać: Napięcie w mV w przeciwnym razie: 'False': int or bool
         """
         self._send_data("AT+CBC\n")
-        resp = self._read_data(0.2)
-        #print(data)
-        index = resp.find("+CBC:")
-        print("Index: " + str(index))
-        if(index > 0):
-            resp = resp[index + 6 : index + 16].replace("\n", "").split(",")
-            if(len(resp) == 3):
-                voltage = resp[2]
-                return voltage
-            else:
-                print("---Nie udalo sie odczytac napiecia---") #jeśli nie uda się odczytać napięcia
-                return False
-        else:
+        resp = self._read_response(1)
+        #print(resp)
+        voltage = parse_voltage(resp)
+        if(voltage is False):
             print("--Nie udalo sie odczytac napiecia--") #jeśli nie uda się odczytać napięcia
-            return False
+        return voltage
 
 
 
@@ -268,18 +874,11 @@ class My_sim800l:
         :return: Czas (rr/mm/dd, hh:mm:ss) lub 'False; jeśli nie uda się pobrać danych: tuple(string, string) or bool
         """
         self._send_data("AT+CCLK?\n")
-        resp = self._read_data(0.2)
-
-        if(resp.find("OK") > 0):
-            date_time = resp[resp.find('"')+1 : resp.rfind('+')]
-            date_time = date_time.split(",")
-            date = date_time[0]
-            time = date_time[1]
-            #print((date, time))
-            return (date, time)
-        else:
+        resp = self._read_response(1)
+        date_time = parse_utc_time(resp)
+        if(not date_time):
             print("--Nie udalo sie pobrac czasu--")
-            return False
+        return date_time
 
 
 
@@ -290,15 +889,12 @@ class My_sim800l:
         :return: Siła sygnału 0-31: int
         """
         self._send_data("AT+CSQ\n")
-        resp = self._read_data(0.2)
+        resp = self._read_response(1)
         #print(resp)
-        if(resp.find("OK")):
-            signal = resp[resp.find(":")+2 : resp.rfind(",")]
-            #print(signal)
-            return str(signal)
-        else:
+        signal = parse_signal_strength(resp)
+        if(signal is False):
             print("--Nie udalo sie pobrac sily sygnalu--")
-            return False
+        return signal
 
 
 
@@ -309,13 +905,13 @@ class My_sim800l:
         :return: 'True' jeśli się uda, w przeciwnym razie 'False': bool
         """
         self._send_data("AT+CIPMODE=1\n")
-        resp = self._read_data(0.2)
-        if (resp.find("OK") > 0):
+        resp = self._read_response(1)
+        if (resp.find(b"OK") >= 0):
             print("--Wlaczono tryb transparentny--")
             return True
         else:
             print("--Nie udalo sie wlaczyc trybu transparentnego--")
-            return True
+            return False
 
 
 
@@ -326,13 +922,42 @@ class My_sim800l:
         :return: 'True' jeśli się uda, w przeciwnym razie 'False': bool
         """
         self._send_data("AT+CIPMODE=0\n")
-        resp = self._read_data(0.2)
-        if (resp.find("OK") > 0):
+        resp = self._read_response(1)
+        if (resp.find(b"OK") >= 0):
             print("--Wylaczono tryb transparentny--")
             return True
         else:
             print("--Nie udalo sie wylaczyc trybu transparentnego--")
-            return True
+            return False
+
+
+
+    def open_transparent_connection(self, server, port=80):
+        """
+        Funkcja otwierająca połączenie TCP w trybie transparentnym (AT+CIPMODE=1).
+        *Dane są przesyłane bez AT+CIPSEND - z prędkością interfejsu UART
+        *Do czasu zamknięcia połączenia (close) nie można wysyłać poleceń AT
+
+        :param server: Adres serwera: string
+        :param port: port - domyślnie: 80: int
+        :return: Obiekt połączenia lub 'False' gdy błąd: My_sim800l_connection or bool
+        """
+        if(self._tcp_host):
+            self.close_connection()
+        if(not self.enable_transparent_mode()):
+            return False
+
+        self._send_data('AT+CIPSTART="TCP"' + ',"' + server + '",' + str(port) + "\n")
+        # w trybie transparentnym moduł odpowiada 'CONNECT' zamiast 'CONNECT OK'
+        resp = self._read_response(10, (b"CONNECT", b"ALREADY CONNECT", b"ERROR"))
+        if(resp.find(b"CONNECT") < 0 or resp.find(b"CONNECT FAIL") >= 0 or resp.find(b"ALREADY CONNECT") >= 0):
+            print("--Blad polaczenia z serwerem--")
+            self.disable_transparent_mode()
+            return False
+
+        print("--Polaczono z: " + server + " (tryb transparentny)--")
+        self._tcp_host = (server, port)
+        return My_sim800l_connection(self)
 
 
 
@@ -343,9 +968,9 @@ class My_sim800l:
         :return: Jeśli uda się wyłączyć tryb debugowania: 'True', w przeciwnym wypadku: 'False: bool
         """
         self._send_data("AT+CMEE=0\n")
-        resp = self._read_data(0.2)
+        resp = self._read_response(1)
         #print(resp)
-        if(resp.find("OK") > 0):
+        if(resp.find(b"OK") >= 0):
             print("--Wylaczono tryb debugowania--")
             return True
         else:
@@ -358,16 +983,13 @@ class My_sim800l:
         """
         Funkcja usypiająca moduł sim800l.
         Pobór prądu ok. 2mA.
-        Blokuje program na 5,2s.
+        Nie czeka na uśpienie - moduł zasypia sam po ok. 5s bez komunikacji na UART.
 
         :return: 'True' jeśli się uda, w przeciwnym razie 'False': bool
         """
         self.sleep_pin.value(1)
-        self._send_data("AT+CSCLK=2\n")
-        resp = self._read_data(0.2)
-        if(resp.find("OK") > 0):
+        if(self._send_command("AT+CSCLK=2\n")):
             print("--Usypianie modulu--")
-            sleep(5)
             return True
         else:
             print("--Nie udalo się uspic modulu--")
@@ -375,19 +997,17 @@ class My_sim800l:
 
 
 
-    def wake_up(self):
+    def wake_up(self, timeout=3):
         """
-        Funkcja usypiająca moduł sim800l.
-        Pobór prądu ok. 2mA.
-        Blokuje program na 1,7s.
+        Funkcja wybudzająca moduł sim800l.
+        Blokuje program tylko do momentu odpowiedzi modułu na 'AT' (maksymalnie 'timeout').
 
+        :param timeout: Maksymalny czas[s] oczekiwania na wybudzenie: int
         :return: 'True' jeśli się uda, w przeciwnym razie 'False': bool
         """
         self.sleep_pin.value(0)
-        self._ping(2)
-        self._send_data("AT+CSCLK=0\n")
-        resp = self._read_data(0.2)
-        if (resp.find("OK") > 0):
+        # pierwszy znak po uśpieniu może zostać zgubiony - pingujemy do skutku
+        if (self._ping(timeout * 2) and self._send_command("AT+CSCLK=0\n")):
             print("--Wybudzanie modulu--")
             return True
         else:
@@ -396,24 +1016,254 @@ class My_sim800l:
 
 
 
-    def reset(self):
+    def reset(self, timeout=15):
         """
-        Funkcja resetująca układ sim800l, po resecie należy odczekać przynajmniej 5 sekund przed wysłaniem kolejnego polecenia.
-        Blokuje program na 5,2s.
+        Funkcja resetująca układ sim800l.
+        Blokuje program do momentu gotowości modułu (odpowiedź na 'AT' wysyłane co 0,5s, komunikat 'RDY',
+        'Call Ready' lub 'SMS Ready' albo zmiana pinu STATUS), maksymalnie 'timeout'.
+        *Moduł w trybie autobaud nie wysyła komunikatów gotowości przed pierwszym poleceniem 'AT'
 
+        :param timeout: Maksymalny czas[s] oczekiwania na gotowość modułu: int
         :return: 'True' jeśli uda się zresetować, w przeciwnym wypadku 'False': bool
         """
-        self._send_data("AT+CFUN=1,1\n")
-        resp = self._read_data(0.2)
-        if (resp.find("OK") > 0):
-            print("--Reset--")
-            sleep(5)
-            return True
-        else:
+        t = ticks_ms()
+        if (not self._send_command("AT+CFUN=1,1\n")):
             print("--Nie udalo sie zresetowac--")
-            return True
+            return False
+
+        print("--Reset--")
+        went_low = self._wait_status(0, 2)
+        ready = (b"OK", b"RDY", b"+CFUN:", b"Call Ready", b"SMS Ready")
+        while(ticks_diff(ticks_ms(), t) < timeout * 1000):
+            resp = self._read_response(0.5, ready)
+            if(resp.terminator >= 0):
+                if(resp.startswith(b"OK", resp.terminator)):
+                    return True
+                break           #komunikat gotowości - potwierdzenie przez 'AT'
+            if(self.status_pin is not None and went_low and self.status_pin.value()):
+                break
+            self._send_data("AT\n")
+        return self._ping(max(int((timeout - ticks_diff(ticks_ms(), t) / 1000) * 2), 1))
 
 
 
     def debug(self):
         return self._read_data()
+
+
+
+class My_sim800l_connection:
+    """
+    Klasa połączenia TCP w trybie transparentnym modułu sim800l - interfejs podobny do pliku/gniazda.
+    *Tworzona przez My_sim800l.open_transparent_connection
+    *Powrót do trybu poleceń sekwencją '+++' z zachowaniem wymaganych przerw (GUARD_TIME_MS)
+
+    Przykładowa procedura:
+    1. Otwarcie połączenia
+    2. Wysyłanie (write / write_from) i odbiór danych (readinto)
+    3. Zamknięcie połączenia (close)
+    """
+
+    # Wymagana cisza na linii przed i po sekwencji '+++'
+    GUARD_TIME_MS = const(1000)
+
+    def __init__(self, sim, timeout=5):
+        """
+        :param sim: Obiekt modułu sim800l: My_sim800l
+        :param timeout: Maksymalny czas[s] oczekiwania na dane w readinto: int or float
+        """
+        self.sim = sim
+        self.uart = sim.uart
+        self.timeout = timeout
+        self.closed = False
+        self._last_write = ticks_ms()
+
+
+    def write(self, data):
+        """
+        Funkcja wysyłająca dane.
+
+        :param data: Dane do wysłania: bytes or bytearray or memoryview
+        :return: Liczba wysłanych bajtów: int
+        """
+        n = self.uart.write(data)
+        self._last_write = ticks_ms()
+        return n
+
+
+    def write_from(self, f, buf_size=512):
+        """
+        Funkcja wysyłająca całą zawartość otwartego pliku (np. zaległych logów z karty SD).
+
+        :param f: Plik otwarty w trybie binarnym: file
+        :param buf_size: Rozmiar bufora w bajtach: int
+        :return: Liczba wysłanych bajtów: int
+        """
+        buf = bytearray(buf_size)
+        mv = memoryview(buf)
+        total = 0
+        n = f.readinto(buf)
+        while(n):
+            self.write(mv[:n])
+            total += n
+            n = f.readinto(buf)
+        return total
+
+
+    def any(self):
+        """
+        :return: Liczba bajtów gotowych do odczytu: int
+        """
+        return self.uart.any()
+
+
+    def readinto(self, buf):
+        """
+        Funkcja odczytująca dostępne dane do bufora, czeka maksymalnie 'timeout' na pierwsze bajty.
+
+        :param buf: Bufor na dane: bytearray or memoryview
+        :return: Liczba odczytanych bajtów, 0 jeśli upłynął czas: int
+        """
+        t = ticks_ms()
+        while(not self.uart.any()):
+            if(ticks_diff(ticks_ms(), t) >= self.timeout * 1000):
+                return 0
+            sleep_ms(5)
+        n = self.uart.readinto(buf)
+        return n if n else 0
+
+
+    def close(self):
+        """
+        Funkcja wychodząca z trybu transparentnego ('+++') i zamykająca połączenie TCP.
+
+        :return: 'True' jeśli moduł wrócił do trybu poleceń, w przeciwnym wypadku 'False': bool
+        """
+        if(self.closed):
+            return True
+        self.closed = True
+
+        # przed '+++' wymagana jest cisza na linii
+        wait = self.GUARD_TIME_MS - ticks_diff(ticks_ms(), self._last_write)
+        if(wait > 0):
+            sleep_ms(wait)
+        while(self.uart.any()):
+            self.uart.read()
+        self.uart.write("+++")
+        sleep_ms(self.GUARD_TIME_MS)
+
+        resp = self.sim._read_response(2, (b"OK", b"CLOSED", b"ERROR"))
+        escaped = resp.find(b"OK") >= 0 or resp.find(b"CLOSED") >= 0
+
+        self.sim.close_connection()
+        self.sim.disable_transparent_mode()
+        return escaped
+
+
+
+class My_sim800l_http_response:
+    """
+    Klasa odpowiedzi wbudowanego stosu http modułu sim800l - treść jest czytana zakresami (AT+HTTPREAD),
+    więc odpowiedź nie musi mieścić się w buforze UART.
+    *Tworzona przez My_sim800l.send_http_request przy transporcie "http"
+    *Interfejs jak My_http_response (status, headers, readinto, read, text, close)
+    """
+
+    def __init__(self, sim, status, length):
+        """
+        :param sim: Obiekt modułu sim800l: My_sim800l
+        :param status: Kod statusu http: int
+        :param length: Długość treści w bajtach: int
+        """
+        self.sim = sim
+        self.status = status
+        self.reason = ""
+        self.headers = {}
+        self.length = length
+        self._offset = 0
+        self._closed = False
+
+
+    def readinto(self, buf):
+        """
+        Funkcja odczytująca kolejny zakres treści odpowiedzi do bufora.
+
+        :param buf: Bufor na dane: bytearray or memoryview
+        :return: Liczba odczytanych bajtów, 0 na końcu treści: int
+        """
+        sim = self.sim
+        # odpowiedź na AT+HTTPREAD musi zmieścić się w buforze odpowiedzi
+        size = min(len(buf), self.length - self._offset, sim.resp.size // 2)
+        if(size <= 0 or self._closed):
+            return 0
+
+        # +HTTPREAD: <n>\r\n<dane>\r\nOK
+        sim._send_data("AT+HTTPREAD=" + str(self._offset) + "," + str(size) + "\n")
+        resp = sim._read_response(5, (b"+HTTPREAD:", b"ERROR"))
+        index = resp.find(b"+HTTPREAD:")
+        if(index < 0):
+            return 0
+        n, pos = parse_int(resp, index + 10)
+        if(not n):
+            return 0
+        start = resp.find(b"\n", pos) + 1
+
+        # część danych mogła już trafić do bufora odpowiedzi, reszta czeka w UART
+        copied = resp.copy_into(buf, start, start + n)
+        if(copied == n):
+            # 'OK' po danych mógł już zostać odczytany do bufora odpowiedzi - bez czyszczenia bufora
+            line = start + n
+            resp.terminator = -1
+            t = ticks_ms()
+            while(True):
+                line = resp.scan_lines(line, sim.FINAL_RESPONSES)
+                if(resp.terminator >= 0 or ticks_diff(ticks_ms(), t) >= 1000):
+                    break
+                if(not resp.fill(sim.uart)):
+                    sleep_ms(5)
+        else:
+            mv = memoryview(buf)
+            t = ticks_ms()
+            while(copied < n and ticks_diff(ticks_ms(), t) < 5000):
+                if(sim.uart.any()):
+                    copied += sim.uart.readinto(mv[copied : n], n - copied) or 0
+                else:
+                    sleep_ms(5)
+            sim._read_response(1)       #'OK' po danych
+
+        self._offset += copied
+        return copied
+
+
+    def read(self, size=-1):
+        """
+        :param size: Maksymalna liczba bajtów, domyślnie cała pozostała treść: int
+        :return: Odczytane dane: bytes
+        """
+        if(size < 0):
+            size = self.length - self._offset
+        buf = bytearray(size)
+        mv = memoryview(buf)
+        total = 0
+        n = self.readinto(mv)
+        while(n):
+            total += n
+            n = self.readinto(mv[total:])
+        return bytes(mv[:total])
+
+
+    def text(self):
+        """
+        :return: Cała pozostała treść odpowiedzi jako tekst: string
+        """
+        return self.read().decode("utf-8")
+
+
+    def close(self):
+        """
+        Funkcja kończąca sesję http modułu (AT+HTTPTERM).
+        """
+        if(self._closed):
+            return
+        self._closed = True
+        self.sim._send_command("AT+HTTPTERM\n")
@@ -0,0 +1,410 @@
+import uasyncio as asyncio
+from machine import UART, Pin
+from utime import ticks_ms, ticks_diff
+from My_sim800l import build_http_request, parse_sim_status, parse_voltage, parse_utc_time, parse_signal_strength
+
+
+class _AtCommand:
+    """
+    Pojedyncze polecenie AT oczekujące w kolejce na wysłanie.
+    """
+    def __init__(self, cmd, terminators, timeout, prefix=None, payload=None):
+        self.cmd = cmd
+        self.final_terminators = terminators
+        # przy wysyłaniu danych najpierw czekamy na znak zachęty '> '
+        self.terminators = (b">", b"ERROR") if payload is not None else terminators
+        self.timeout = timeout
+        self.prefix = prefix
+        self.payload = payload
+        self.resp = b""
+        self.stage_done = asyncio.Event()
+        self.finished = asyncio.Event()
+
+
+
+class My_sim800l_async:
+    """
+    Klasa odpowiedzialna za asynchroniczną (uasyncio) obsługę modułu sim800l.
+    *Wspierane urządzenia: ESP32
+    *Polecenia AT są wysyłane po kolei z kolejki, a odpowiedzi przypisywane do polecenia, które je wywołało
+    *Niezamówione komunikaty modułu (URC) są przekazywane do zarejestrowanych funkcji (on_urc)
+    *Nie blokuje programu - pomiary i zapis logów mogą działać w trakcie wymiany danych z serwerem
+
+    Przykładowa procedura:
+    1. Inicjalizacja
+    2. Uruchomienie zadań odczytu i zapisu (start) w pętli uasyncio
+    3. Rejestracja funkcji obsługujących URC
+    4. Wysyłanie poleceń (await)
+    """
+
+    # Kody kończące odpowiedź na zwykłe polecenie AT
+    COMMAND_TERMINATORS = (b"OK", b"ERROR", b"+CME ERROR")
+
+    # Prefiksy niezamówionych komunikatów modułu (URC)
+    URC_PREFIXES = (b"+CMTI", b"CLOSED", b"+PDP: DEACT", b"UNDER-VOLTAGE", b"OVER-VOLTAGE", b"RING",
+                    b"Call Ready", b"SMS Ready", b"+CPIN:", b"NORMAL POWER DOWN", b"RDY", b"+CFUN:")
+
+    # Komunikaty oznaczające gotowość modułu po resecie
+    READY_URCS = (b"RDY", b"Call Ready", b"SMS Ready")
+
+    def __init__(self, sleep_pin, uart=2, baudrate=115200, rx=16, tx=17, rxbuf=1024, status_pin=None):
+        """
+        :param sleep_pin: Numer pinu DTR - sim800l
+        :param uart: Numer interfejsu UART: int
+        :param baudrate: Prędkość transmisji
+        :param rx: Numer pinu rx
+        :param tx: Numer pinu tx
+        :param status_pin: Opcjonalny numer pinu podłączonego do wyjścia STATUS - sim800l: int
+        """
+        self.sleep_pin = Pin(sleep_pin, Pin.OUT)
+        self.status_pin = Pin(status_pin, Pin.IN) if status_pin is not None else None
+        self.uart = UART(uart, baudrate=baudrate, rx=rx, tx=tx, rxbuf=rxbuf)
+
+        self.sleep_pin.value(0)
+
+        self._reader = asyncio.StreamReader(self.uart)
+        self._writer = asyncio.StreamWriter(self.uart, {})
+
+        self._queue = []
+        self._queue_event = asyncio.Event()
+        self._current = None
+        self._line = b""
+        self._urc_callbacks = []
+        self._tasks = []
+        self._ready = asyncio.Event()
+
+
+    def start(self):
+        """
+        Funkcja uruchamiająca zadania odczytu i wysyłania danych - należy wywołać wewnątrz pętli uasyncio.
+        """
+        if(not self._tasks):
+            self._tasks = [asyncio.create_task(self._rx_task()), asyncio.create_task(self._tx_task())]
+
+
+    def stop(self):
+        """
+        Funkcja zatrzymująca zadania odczytu i wysyłania danych.
+        """
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+
+    def on_urc(self, prefix, callback):
+        """
+        Funkcja rejestrująca obsługę niezamówionego komunikatu modułu (URC).
+        *Funkcja 'callback' może być zwykłą funkcją lub korutyną
+
+        :param prefix: Początek linii komunikatu, np. b"+CMTI": bytes
+        :param callback: Funkcja wywoływana z treścią linii komunikatu: function
+        """
+        self._urc_callbacks.append((prefix, callback))
+
+
+    def remove_urc(self, prefix, callback=None):
+        """
+        Funkcja usuwająca obsługę komunikatu URC.
+
+        :param prefix: Początek linii komunikatu: bytes
+        :param callback: Opcjonalna funkcja do usunięcia, domyślnie wszystkie dla danego prefiksu: function
+        """
+        self._urc_callbacks = [(p, c) for (p, c) in self._urc_callbacks
+                               if p != prefix or (callback is not None and c != callback)]
+
+
+    async def send_command(self, cmd, timeout=1, terminators=None, prefix=None, payload=None):
+        """
+        Funkcja dodająca polecenie AT do kolejki i czekająca na odpowiedź.
+
+        :param cmd: Polecenie AT (z '\\n' na końcu): string
+        :param timeout: Maksymalny czas[s] oczekiwania na odpowiedź: int or float
+        :param terminators: Prefiksy linii kończących odpowiedź (bytes), domyślnie COMMAND_TERMINATORS: tuple
+        :param prefix: Opcjonalny prefiks linii z danymi odpowiedzi (np. b"+CSQ"), które nie są traktowane jak URC: bytes
+        :param payload: Opcjonalne dane wysyłane po znaku zachęty '> ' (np. dla AT+CIPSEND): string
+        :return: Odpowiedź modułu (pusta, jeśli moduł nie odpowiedział): bytes
+        """
+        if(terminators is None):
+            terminators = self.COMMAND_TERMINATORS
+        command = _AtCommand(cmd, terminators, timeout, prefix, payload)
+        self._queue.append(command)
+        self._queue_event.set()
+        await command.finished.wait()
+        return command.resp
+
+
+    async def _tx_task(self):
+        """
+        Zadanie wysyłające kolejne polecenia z kolejki.
+        """
+        while True:
+            if(not self._queue):
+                self._queue_event.clear()
+                await self._queue_event.wait()
+                continue
+
+            command = self._queue.pop(0)
+            self._current = command
+            try:
+                await self._exchange(command)
+            finally:
+                self._current = None
+                command.finished.set()
+
+
+    async def _exchange(self, command):
+        """
+        Funkcja wysyłająca polecenie i czekająca na jego zakończenie.
+        """
+        await self._write(command.cmd)
+        if(command.payload is not None):
+            if(not await self._wait_stage(command) or not command.resp.endswith(b"> ")):
+                return
+            command.stage_done.clear()
+            command.terminators = command.final_terminators
+            await self._write(command.payload)
+        await self._wait_stage(command)
+
+
+    async def _write(self, data):
+        if(isinstance(data, str)):
+            data = data.encode()        #StreamWriter.write w starszych wersjach uasyncio przyjmuje tylko bajty
+        self._writer.write(data)
+        await self._writer.drain()
+
+
+    async def _wait_stage(self, command):
+        """
+        :return: 'True' jeśli odpowiedź przyszła przed upływem czasu, w przeciwnym wypadku 'False': bool
+        """
+        try:
+            await asyncio.wait_for(command.stage_done.wait(), command.timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+    async def _rx_task(self):
+        """
+        Zadanie odczytujące dane z UART i dzielące je na linie.
+        """
+        while True:
+            data = await self._reader.read(64)
+            if(not data):
+                continue
+            self._line += data
+
+            # znak zachęty '> ' nie kończy się znakiem nowej linii
+            command = self._current
+            if(command and b">" in command.terminators and self._line.endswith(b"> ")):
+                command.resp += self._line
+                self._line = b""
+                command.stage_done.set()
+                continue
+
+            index = self._line.find(b"\n")
+            while(index >= 0):
+                self._handle_line(self._line[:index + 1])
+                self._line = self._line[index + 1:]
+                index = self._line.find(b"\n")
+
+
+    def _handle_line(self, line):
+        """
+        Funkcja przypisująca linię do aktualnego polecenia lub przekazująca ją jako URC.
+        """
+        text = line.strip()
+        command = self._current
+
+        if(command and not command.stage_done.is_set()):
+            if(command.prefix and text.startswith(command.prefix)):
+                command.resp += line
+                return
+            for t in command.terminators:
+                if(text.startswith(t)):
+                    command.resp += line
+                    command.stage_done.set()
+                    return
+
+        if(text and self._dispatch_urc(text)):
+            return
+
+        if(command):
+            command.resp += line
+
+
+    def _dispatch_urc(self, text):
+        """
+        :param text: Linia bez białych znaków na końcach: bytes
+        :return: 'True' jeśli linia jest komunikatem URC, w przeciwnym wypadku 'False': bool
+        """
+        is_urc = False
+        for prefix in self.URC_PREFIXES:
+            if(text.startswith(prefix)):
+                is_urc = True
+        for prefix in self.READY_URCS:
+            if(text.startswith(prefix)):
+                self._ready.set()
+
+        for (prefix, callback) in self._urc_callbacks:
+            if(text.startswith(prefix)):
+                is_urc = True
+                try:
+                    result = callback(text.decode("utf-8"))
+                    # korutyna - uruchamiamy jako osobne zadanie
+                    if(hasattr(result, "send")):
+                        asyncio.create_task(result)
+                except Exception as e:
+                    print(e)
+                    print("--Blad obslugi URC: " + text.decode("utf-8") + "--")
+
+        return is_urc
+
+
+    async def wait_ready(self, timeout=3):
+        """
+        Funkcja czekająca aż moduł zacznie odpowiadać na 'AT' (maksymalnie 'timeout').
+
+        :param timeout: Maksymalny czas[s] oczekiwania: int or float
+        :return: 'True' jeśli moduł odpowiedział, w przeciwnym wypadku 'False': bool
+        """
+        t = ticks_ms()
+        while(ticks_diff(ticks_ms(), t) < timeout * 1000):
+            resp = await self.send_command("AT\n", 0.5)
+            if(resp.find(b"OK") >= 0):
+                return True
+            if(not resp):
+                continue        #send_command czekał już 0,5s
+            await asyncio.sleep_ms(100)
+        return False
+
+
+    async def _wait_status(self, value, timeout):
+        """
+        :return: 'True' jeśli pin STATUS ma oczekiwany stan lub nie został podany, w przeciwnym wypadku 'False': bool
+        """
+        if(self.status_pin is None):
+            return True
+        t = ticks_ms()
+        while(self.status_pin.value() != value):
+            if(ticks_diff(ticks_ms(), t) >= timeout * 1000):
+                return False
+            await asyncio.sleep_ms(10)
+        return True
+
+
+    async def go_sleep(self):
+        """
+        Funkcja usypiająca moduł sim800l (moduł zasypia sam po ok. 5s bez komunikacji na UART).
+
+        :return: 'True' jeśli się uda, w przeciwnym razie 'False': bool
+        """
+        self.sleep_pin.value(1)
+        resp = await self.send_command("AT+CSCLK=2\n")
+        return resp.find(b"OK") >= 0
+
+
+    async def wake_up(self, timeout=3):
+        """
+        Funkcja wybudzająca moduł sim800l - czeka tylko do momentu odpowiedzi modułu na 'AT'.
+
+        :param timeout: Maksymalny czas[s] oczekiwania na wybudzenie: int
+        :return: 'True' jeśli się uda, w przeciwnym razie 'False': bool
+        """
+        self.sleep_pin.value(0)
+        if(not await self.wait_ready(timeout)):
+            return False
+        resp = await self.send_command("AT+CSCLK=0\n")
+        return resp.find(b"OK") >= 0
+
+
+    async def reset(self, timeout=15):
+        """
+        Funkcja resetująca układ sim800l - czeka na gotowość modułu (odpowiedź na 'AT' wysyłane co 0,5s,
+        komunikat 'RDY', 'Call Ready' lub 'SMS Ready' albo zmiana pinu STATUS), maksymalnie 'timeout'.
+        *Moduł w trybie autobaud nie wysyła komunikatów gotowości przed pierwszym poleceniem 'AT'
+
+        :param timeout: Maksymalny czas[s] oczekiwania na gotowość modułu: int
+        :return: 'True' jeśli uda się zresetować, w przeciwnym wypadku 'False': bool
+        """
+        t = ticks_ms()
+        self._ready.clear()
+        resp = await self.send_command("AT+CFUN=1,1\n")
+        if(resp.find(b"OK") < 0):
+            return False
+
+        went_low = await self._wait_status(0, 2)
+        await asyncio.sleep_ms(500)
+        while(ticks_diff(ticks_ms(), t) < timeout * 1000):
+            if(self._ready.is_set() or (self.status_pin is not None and went_low and self.status_pin.value())):
+                break
+            resp = await self.send_command("AT\n", 0.5)
+            if(resp.find(b"OK") >= 0):
+                return True
+            if(resp):
+                await asyncio.sleep_ms(500)     #odpowiedź inna niż 'OK' - kolejna próba po 0,5s
+        return await self.wait_ready(max(timeout - ticks_diff(ticks_ms(), t) / 1000, 0.5))
+
+
+    async def check_sim(self):
+        """
+        Funkcja sprawdzająca status karty SIM (jak My_sim800l.check_sim).
+
+        :return: Status karty sim: string
+        """
+        resp = await self.send_command("AT+CPIN?\n", 1, prefix=b"+CPIN")
+        return parse_sim_status(resp)
+
+
+    async def get_voltage(self):
+        """
+        Funkcja odczytująca wartość napięcia (mV) zasilającego sim800l.
+
+        :return: Jeśli uda się odczytać: Napięcie w mV w przeciwnym razie: 'False': int or bool
+        """
+        resp = await self.send_command("AT+CBC\n", 1, prefix=b"+CBC")
+        return parse_voltage(resp)
+
+
+    async def get_utc_time(self):
+        """
+        Funkcja pobierająca czas z serwera UTC.
+
+        :return: Czas (rr/mm/dd, hh:mm:ss) lub 'False': tuple(string, string) or bool
+        """
+        resp = await self.send_command("AT+CCLK?\n", 1, prefix=b"+CCLK")
+        return parse_utc_time(resp)
+
+
+    async def get_signal_strength(self):
+        """
+        Funkcja pobierająca siłę sygnału GSM.
+
+        :return: Siła sygnału 0-31 lub 'False': int or bool
+        """
+        resp = await self.send_command("AT+CSQ\n", 1, prefix=b"+CSQ")
+        return parse_signal_strength(resp)
+
+
+    async def send_http_request(self, method, server, headers={}, path="/", data="", json="", port=80):
+        """
+        Funkcja wysyłająca zapytania http (parametry jak w My_sim800l.send_http_request).
+
+        :return: Odpowiedź serwera lub 'False' gdy błąd: string or bool
+        """
+        request = build_http_request(method, server, headers, path, data, json)
+
+        resp = await self.send_command('AT+CIPSTART="TCP"' + ',"' + server + '",' + str(port) + "\n", 10,
+                                       (b"CONNECT OK", b"CONNECT FAIL", b"ALREADY CONNECT", b"ERROR"))
+        if(resp.find(b"CONNECT OK") < 0):
+            print("--Blad polaczenia z serwerem--")
+            return False
+
+        resp = await self.send_command('AT+CIPSEND=' + str(len(request)) + "\n", 10,
+                                       (b"CLOSED", b"SEND FAIL"), payload=request)
+        start = resp.find(b"SEND OK")
+        if(start < 0):
+            print("--Nie udalo sie wyslac zapytania--")
+            return False
+
+        return resp[start + 9 : -8].decode("utf-8")       #wycinamy echo i napis CLOSED z odpowiedzi
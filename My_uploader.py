@@ -0,0 +1,224 @@
+import ujson
+import uos
+from utime import time, ticks_ms, ticks_diff
+import My_fun_dht11
+
+
+class My_uploader:
+    """
+    Klasa zbierająca pomiary (waga, temperatura, wilgotność) i wysyłająca je paczkami - jednym zapytaniem http POST
+    z tablicą JSON, zamiast osobnego zapytania dla każdego pomiaru.
+    *Paczka jest wysyłana po przekroczeniu limitu liczby pomiarów, rozmiaru lub wieku najstarszego pomiaru
+    *Pomiary, których nie udało się wysłać, są zapisywane na karcie SD i wysyłane przy kolejnej udanej próbie
+    *Po nieudanej wysyłce kolejna automatyczna próba następuje dopiero po max_age (bez karty SD najstarsze
+     pomiary są w tym czasie usuwane z kolejki)
+    *Wymaga obiektu My_sim800l z uruchomionym połączeniem GPRS
+
+    Przykładowa procedura:
+    1. Inicjalizacja
+    2. Zbieranie pomiarów (collect / add_measurement)
+    3. Okresowe wywoływanie poll() - wysyłanie paczek po przekroczeniu limitu wieku
+    """
+
+    def __init__(self, sim, server, path="/", port=80, headers={}, sd=None, spool_dir="/sd/upload_queue.txt",
+                 max_count=20, max_size=1024, max_age=600):
+        """
+        :param sim: Obiekt modułu sim800l: My_sim800l
+        :param server: Serwer do którego mają być wysyłane pomiary: string
+        :param path: Ścieżka po ukośniku - domyślnie: "/": string
+        :param port: port - domyślnie: 80: int
+        :param headers: Dodatkowe nagłówki http: dictionary
+        :param sd: Opcjonalny obiekt karty SD do przechowywania niewysłanych pomiarów: My_SDCard
+        :param spool_dir: Ścieżka do pliku z niewysłanymi pomiarami: string
+        :param max_count: Maksymalna liczba pomiarów w paczce: int
+        :param max_size: Maksymalny rozmiar paczki w bajtach: int
+        :param max_age: Maksymalny wiek[s] najstarszego pomiaru w paczce: int
+        """
+        self.sim = sim
+        self.server = server
+        self.path = path
+        self.port = port
+        self.headers = headers
+        self.sd = sd
+        self.spool_dir = spool_dir
+        self.max_count = max_count
+        self.max_size = max_size
+        self.max_age = max_age
+
+        self.queue = []
+        self._size = 2          #nawiasy tablicy JSON
+        self._first_ms = None
+        self._fail_ms = None        #czas ostatniej nieudanej wysyłki
+
+
+    def collect(self, scale=None, measure=My_fun_dht11.get_measure):
+        """
+        Funkcja wykonująca pomiar wagi, temperatury i wilgotności i dodająca go do kolejki.
+
+        :param scale: Opcjonalny obiekt wagi: My_hx711
+        :param measure: Funkcja zwracająca (temperatura, wilgotność) lub 'False' - domyślnie My_fun_dht11.get_measure: function
+        :return: Wynik add_measurement: bool
+        """
+        weight = scale.get_weight_g() if scale else None
+
+        temp = None
+        hum = None
+        result = measure() if measure else False
+        if(result):
+            temp, hum = result
+
+        return self.add_measurement(weight, temp, hum)
+
+
+    def add_measurement(self, weight=None, temp=None, hum=None, timestamp=None):
+        """
+        Funkcja dodająca pomiar do kolejki, po przekroczeniu limitu liczby pomiarów lub rozmiaru wysyła paczkę.
+
+        :param weight: Waga w g: float
+        :param temp: Temperatura: int
+        :param hum: Wilgotność: int
+        :param timestamp: Opcjonalny czas pomiaru, domyślnie utime.time(): int
+        :return: 'False' jeśli nie udało się wysłać paczki, w przeciwnym wypadku 'True': bool
+        """
+        if(timestamp is None):
+            timestamp = time()
+        record = ujson.dumps({"t": timestamp, "w": weight, "temp": temp, "hum": hum})
+
+        if(self.queue and self._size + len(record) + 1 > self.max_size):
+            if(self._waiting() or not self.flush()):
+                self._drop_oldest(len(record) + 1)
+        elif(len(self.queue) >= self.max_count):
+            self._drop_oldest(len(record) + 1)          #pełna paczka czeka na ponowną próbę wysyłki
+
+        self.queue.append(record)
+        self._size += len(record) + 1
+        if(self._first_ms is None):
+            self._first_ms = ticks_ms()
+
+        if(len(self.queue) >= self.max_count):
+            if(self._waiting()):
+                return False
+            return self.flush()
+        return True
+
+
+    def poll(self):
+        """
+        Funkcja do okresowego wywoływania - wysyła paczkę, jeśli najstarszy pomiar przekroczył limit wieku.
+
+        :return: 'False' jeśli nie udało się wysłać paczki, w przeciwnym wypadku 'True': bool
+        """
+        if(self._first_ms is not None and ticks_diff(ticks_ms(), self._first_ms) >= self.max_age * 1000):
+            if(self._waiting()):
+                return False
+            return self.flush()
+        return True
+
+
+    def flush(self):
+        """
+        Funkcja wysyłająca wszystkie pomiary z kolejki oraz pomiary zapisane wcześniej na karcie SD.
+        *Jeśli wysłanie się nie uda, pomiary z kolejki są zapisywane na karcie SD (jeśli jest dostępna)
+
+        :return: 'True' jeśli udało się wysłać, w przeciwnym wypadku 'False': bool
+        """
+        if(not self.queue or self._send(self.queue)):
+            self._clear()
+            if(self._flush_spool()):
+                self._fail_ms = None
+                return True
+            self._fail_ms = ticks_ms()
+            return False
+
+        print("--Nie udalo sie wyslac paczki pomiarow--")
+        self._fail_ms = ticks_ms()
+        if(self.sd and self.sd.log_data("\n".join(self.queue), self.spool_dir)):
+            self._clear()
+        return False
+
+
+    def _waiting(self):
+        """
+        :return: 'True' jeśli od ostatniej nieudanej wysyłki nie minął jeszcze max_age: bool
+        """
+        return self._fail_ms is not None and ticks_diff(ticks_ms(), self._fail_ms) < self.max_age * 1000
+
+
+    def _send(self, records):
+        """
+        Funkcja wysyłająca pomiary jako tablicę JSON.
+
+        :param records: Pomiary w formacie JSON: list
+        :return: 'True' jeśli serwer przyjął dane, w przeciwnym wypadku 'False': bool
+        """
+        resp = self.sim.send_http_request("POST", self.server, headers=self.headers, path=self.path,
+                                          json="[" + ",".join(records) + "]", port=self.port, keep_alive=True,
+                                          stream=True)
+        if(not resp):
+            return False
+        resp.close()
+        return resp.status is not None and 200 <= resp.status < 300
+
+
+    def _flush_spool(self):
+        """
+        Funkcja wysyłająca paczkami pomiary zapisane na karcie SD, niewysłane pozostają w pliku.
+
+        :return: 'True' jeśli udało się wysłać wszystkie pomiary, w przeciwnym wypadku 'False': bool
+        """
+        if(not self.sd):
+            return True
+        try:
+            f = open(self.spool_dir, "r")
+        except OSError:
+            return True         #brak zaległych pomiarów
+
+        batch = []
+        rest = None
+        for line in f:
+            line = line.strip()
+            if(not line):
+                continue
+            batch.append(line)
+            if(len(batch) >= self.max_count):
+                if(not self._send(batch)):
+                    rest = batch
+                    break
+                batch = []
+        if(rest is None and batch and not self._send(batch)):
+            rest = batch
+
+        if(rest is None):
+            f.close()
+            uos.remove(self.spool_dir)
+            return True
+
+        # przepisanie niewysłanych pomiarów do nowego pliku
+        tmp_dir = self.spool_dir + ".tmp"
+        tmp = open(tmp_dir, "w")
+        tmp.write("\n".join(rest) + "\n")
+        for line in f:
+            tmp.write(line)
+        tmp.close()
+        f.close()
+        uos.remove(self.spool_dir)
+        uos.rename(tmp_dir, self.spool_dir)
+        return False
+
+
+    def _drop_oldest(self, needed):
+        """
+        Funkcja usuwająca najstarsze pomiary z kolejki, aby zmieścić nowy pomiar w limitach.
+
+        :param needed: Rozmiar nowego pomiaru w bajtach: int
+        """
+        while(self.queue and (len(self.queue) >= self.max_count or self._size + needed > self.max_size)):
+            self._size -= len(self.queue.pop(0)) + 1
+        if(not self.queue):
+            self._first_ms = None
+
+
+    def _clear(self):
+        self.queue = []
+        self._size = 2
+        self._first_ms = None
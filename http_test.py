@@ -0,0 +1,69 @@
+from My_http import My_http_response
+
+# test parsera odpowiedzi http (My_http.My_http_response) na danych z pamięci zamiast UART
+# uruchomienie na komputerze: micropython http_test.py
+
+
+class Fake_stream:
+    """
+    Strumień z metodami 'any' i 'readinto' oddający dane porcjami (jak UART).
+    """
+
+    def __init__(self, data, part=32):
+        """
+        :param data: Dane do odczytu: bytes
+        :param part: Maksymalna liczba bajtów zwracana przez jeden odczyt: int
+        """
+        self.data = data
+        self.part = part
+        self.pos = 0
+
+
+    def any(self):
+        return len(self.data) - self.pos
+
+
+    def readinto(self, buf):
+        n = min(len(buf), self.part, len(self.data) - self.pos)
+        buf[:n] = self.data[self.pos : self.pos + n]
+        self.pos += n
+        return n
+
+
+def response(data, buf_size=256):
+    return My_http_response(Fake_stream(data), timeout=0.1, buf_size=buf_size)
+
+
+def test_content_length():
+    resp = response(b"SEND OK\r\nHTTP/1.1 200 OK\r\nContent-Length: 5\r\nX-A: b\r\n\r\nhello+CLOSED\r\n")
+    assert resp.status == 200
+    assert resp.reason == "OK"
+    assert resp.headers == {"content-length": "5", "x-a": "b"}
+    assert resp.read() == b"hello"
+
+
+def test_chunked():
+    resp = response(b"HTTP/1.1 201 Created\r\nTransfer-Encoding: chunked\r\n\r\n"
+                    b"4\r\nabcd\r\n3;x=1\r\nefg\r\n0\r\nX-Trailer: 1\r\n\r\n")
+    assert resp.status == 201
+    assert resp.read() == b"abcdefg"
+
+
+def test_oversized_header():
+    cookie = b"Set-Cookie: " + b"x" * 300
+    resp = response(b"HTTP/1.1 200 OK\r\n" + cookie + b"\r\nContent-Length: 4\r\n\r\nbodyrest", buf_size=64)
+    assert resp.status == 200
+    assert resp.headers["set-cookie"] == "x" * (64 - len(b"Set-Cookie: "))       #wartość obcięta do bufora
+    assert resp.headers["content-length"] == "4"
+    assert resp.read() == b"body"
+
+
+def test_no_body_length():
+    resp = response(b"HTTP/1.0 404 Not Found\r\n\r\nmissing")
+    assert resp.status == 404
+    assert resp.text() == "missing"
+
+
+for test in (test_content_length, test_chunked, test_oversized_header, test_no_body_length):
+    test()
+    print("--OK: " + test.__name__ + "--")
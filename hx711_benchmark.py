@@ -0,0 +1,37 @@
+from utime import ticks_us, ticks_diff
+from My_hx711 import My_hx711
+
+# porównanie czasu odczytu hx711: rejestry GPIO (viper) vs Pin.value()
+# uruchomienie z komputera: mpremote run hx711_benchmark.py
+
+CLK_PIN = 18
+DATA_PIN = 19
+SAMPLES = 20
+
+
+def measure(scale, shift_in):
+    """
+    :param scale: Obiekt wagi: My_hx711
+    :param shift_in: Funkcja odczytu 24 bitów: function
+    :return: (średni czas odczytu[us], maksymalny czas odczytu[us], ostatni odczyt): tuple
+    """
+    total = 0
+    worst = 0
+    value = 0
+    for i in range(SAMPLES):
+        scale._wait()
+        t = ticks_us()
+        value = shift_in()
+        dt = ticks_diff(ticks_us(), t)
+        total += dt
+        worst = max(worst, dt)
+    return total // SAMPLES, worst, value
+
+
+scale = My_hx711(CLK_PIN, DATA_PIN)
+
+print("--Pin.value(): sredni %d us, max %d us, odczyt %d--" % measure(scale, scale._shift_in_pin))
+if(scale.fast):
+    print("--viper: sredni %d us, max %d us, odczyt %d--" % measure(scale, scale._shift_in_fast))
+else:
+    print("--Szybki odczyt niedostepny na tej platformie--")
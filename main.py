@@ -19,7 +19,7 @@ sim.set_GPRS_connection("internet", "internet", "internet")
 i = 0
 
 # print(sim.send_http_request("GET", "maker.ifttt.com", headers={"Connection":"close", "Content-Length":"46"}, path="/trigger/test/with/key/govMGzo5agE0oFrHj7LVTXqoMX_xrzuN7d_qiiQAuBh", json='{"value1":"asd","value2":"bbb","value3":"ccc"}'))
-print(sim.send_http_request("GET", "validate.jsontest.com", path="/?json=%5BJSON-code-to-validate%5D", headers={"Connection":"close"}))
+print(sim.send_http_request("GET", "validate.jsontest.com", path="/?json=%5BJSON-code-to-validate%5D", keep_alive=True))
 while True:
     sim.led.value(0)
     sleep(1)
@@ -0,0 +1,129 @@
+import socket
+import struct
+import sys
+
+# minimalny broker MQTT 3.1.1 do testów My_mqtt na komputerze (bez QoS 2, bez sesji i wiadomości 'retain')
+# obsługuje CONNECT, PUBLISH (QoS 0/1), SUBSCRIBE, PINGREQ i DISCONNECT - klienci są obsługiwani po kolei
+# wiadomości opublikowane w subskrybowanym temacie są odsyłane do tego samego klienta (QoS 0)
+# uruchomienie: python3 mqtt_fake_broker.py [port]  (także: micropython mqtt_fake_broker.py [port])
+
+PORT = 1883
+
+
+def read_exact(conn, n):
+    data = b""
+    while(len(data) < n):
+        part = conn.recv(n - len(data))
+        if(not part):
+            raise OSError("polaczenie zamkniete")
+        data += part
+    return data
+
+
+def read_packet(conn):
+    """
+    :return: (pierwszy bajt nagłówka, dane pakietu): tuple(int, bytes)
+    """
+    packet_type = read_exact(conn, 1)[0]
+    length = 0
+    shift = 0
+    while(True):
+        byte = read_exact(conn, 1)[0]
+        length |= (byte & 0x7F) << shift
+        shift += 7
+        if(not byte & 0x80):
+            break
+    return packet_type, read_exact(conn, length)
+
+
+def send_packet(conn, packet_type, data=b""):
+    header = bytearray((packet_type,))
+    length = len(data)
+    while(True):
+        byte = length & 0x7F
+        length >>= 7
+        header.append(byte | (0x80 if length else 0))
+        if(not length):
+            break
+    conn.send(bytes(header) + data)
+
+
+def matches(pattern, topic):
+    """
+    :return: 'True' jeśli temat pasuje do wzorca subskrypcji (obsługuje '#' na końcu i '+'): bool
+    """
+    pattern = pattern.split("/")
+    topic = topic.split("/")
+    for i in range(len(pattern)):
+        if(pattern[i] == "#"):
+            return True
+        if(i >= len(topic) or (pattern[i] != "+" and pattern[i] != topic[i])):
+            return False
+    return len(pattern) == len(topic)
+
+
+def serve_client(conn):
+    """
+    Funkcja obsługująca jednego klienta do rozłączenia.
+    """
+    packet_type, data = read_packet(conn)
+    if(packet_type != 0x10):
+        print("--Oczekiwano CONNECT--")
+        return
+    client_len = struct.unpack("!H", data[10:12])[0]
+    print("--CONNECT: " + data[12 : 12 + client_len].decode() + "--")
+    send_packet(conn, 0x20, b"\x00\x00")
+
+    subscriptions = []
+    while(True):
+        packet_type, data = read_packet(conn)
+        kind = packet_type & 0xF0
+        if(kind == 0x30):
+            topic_len = struct.unpack("!H", data[:2])[0]
+            topic = data[2 : 2 + topic_len].decode()
+            pos = 2 + topic_len
+            qos = (packet_type >> 1) & 0x03
+            if(qos):
+                send_packet(conn, 0x40, data[pos : pos + 2])
+                pos += 2
+            print("--PUBLISH QoS%d %s: %s--" % (qos, topic, data[pos:]))
+            for pattern in subscriptions:
+                if(matches(pattern, topic)):
+                    send_packet(conn, 0x30, data[:2 + topic_len] + data[pos:])
+                    break
+        elif(kind == 0x80):
+            pid = data[:2]
+            pos = 2
+            codes = b""
+            while(pos < len(data)):
+                topic_len = struct.unpack("!H", data[pos : pos + 2])[0]
+                subscriptions.append(data[pos + 2 : pos + 2 + topic_len].decode())
+                codes += b"\x00"
+                pos += 3 + topic_len
+            print("--SUBSCRIBE: " + ", ".join(subscriptions) + "--")
+            send_packet(conn, 0x90, pid + codes)
+        elif(kind == 0xC0):
+            print("--PINGREQ--")
+            send_packet(conn, 0xD0)
+        elif(kind == 0xE0):
+            print("--DISCONNECT--")
+            return
+
+
+def main(port=PORT):
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(socket.getaddrinfo("127.0.0.1", port)[0][-1])
+    server.listen(1)
+    print("--Broker testowy MQTT na porcie %d--" % port)
+    while(True):
+        conn, _ = server.accept()
+        try:
+            serve_client(conn)
+        except OSError as e:
+            print(e)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else PORT)
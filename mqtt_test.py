@@ -0,0 +1,76 @@
+import socket
+import sys
+from utime import sleep_ms
+from My_mqtt import My_mqtt, My_socket_connection
+
+# test klienta My_mqtt z lokalnym brokerem testowym (połączenie, PUBACK, kolejka offline, PINGREQ)
+# uruchomienie na komputerze:
+#   python3 mqtt_fake_broker.py 1883
+#   micropython mqtt_test.py 1883
+
+PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 1883
+
+online = False
+attempts = 0
+received = []
+
+
+def connect_fun():
+    """
+    :return: Połączenie z brokerem testowym lub 'None' gdy symulowany jest brak sieci: My_socket_connection
+    """
+    global attempts
+    attempts += 1
+    if(not online):
+        return None
+    sock = socket.socket()
+    sock.connect(socket.getaddrinfo("127.0.0.1", PORT)[0][-1])
+    return My_socket_connection(sock)
+
+
+def on_message(topic, msg):
+    received.append((topic, msg))
+
+
+def wait_messages(client, count):
+    for i in range(20):
+        if(len(received) >= count):
+            return
+        client.check()
+        sleep_ms(50)
+
+
+client = My_mqtt("ul1", connect_fun, keepalive=2, timeout=2, retry_interval=1)
+client.set_callback(on_message)
+
+# brak sieci - wiadomości trafiają do kolejki, kolejna próba połączenia dopiero po 'retry_interval'
+assert not client.publish("test/offline", "1", qos=1)
+assert not client.publish("test/offline", "2")
+assert attempts == 1
+assert len(client.queue) == 2
+print("--OK: kolejka offline i odstep miedzy probami--")
+
+# połączenie po 'retry_interval' - wysłanie kolejki, potwierdzenie QoS 1
+online = True
+sleep_ms(1100)
+assert client.publish("test/online", "3", qos=1)
+assert attempts == 2
+assert not client.queue
+print("--OK: polaczenie, wyslanie kolejki i PUBACK--")
+
+# broker odsyła wiadomości z subskrybowanych tematów
+assert client.subscribe("test/#")
+assert client.publish("test/echo", "4", qos=1)
+wait_messages(client, 1)
+assert received == [("test/echo", b"4")]
+print("--OK: SUBSCRIBE i odbior wiadomosci--")
+
+# keepalive - PINGREQ po połowie czasu, PINGRESP utrzymuje połączenie
+sleep_ms(1100)
+assert client.check()
+assert client.is_connected()
+print("--OK: PINGREQ--")
+
+client.disconnect()
+assert not client.is_connected()
+print("--Wszystkie testy zakonczone--")
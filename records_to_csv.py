@@ -0,0 +1,58 @@
+"""
+Skrypt uruchamiany na komputerze - zamienia binarny plik pomiarów (My_SDCard.My_record_log) na CSV.
+
+Użycie: python records_to_csv.py data.bin [wynik.csv]
+"""
+import csv
+import struct
+import sys
+
+# musi odpowiadać My_SDCard.RECORD_FORMAT
+RECORD_FORMAT = "<IihHB3x"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+FLAG_NO_WEIGHT = 0x01
+FLAG_NO_TEMP = 0x02
+FLAG_NO_HUM = 0x04
+FLAG_TORN = 0x80
+
+
+def decode(data_file):
+    """
+    Generator odczytujący rekordy z pliku (niepełne i przerwane rekordy są pomijane).
+
+    :param data_file: Plik otwarty w trybie binarnym: file
+    :return: Kolejne wiersze (czas, waga[g], temperatura[C], wilgotność[%], flagi): tuple
+    """
+    while True:
+        record = data_file.read(RECORD_SIZE)
+        if len(record) < RECORD_SIZE:
+            return
+        timestamp, weight, temp, hum, flags = struct.unpack(RECORD_FORMAT, record)
+        if flags & FLAG_TORN:
+            continue
+        yield (timestamp,
+               "" if flags & FLAG_NO_WEIGHT else weight / 1000,
+               "" if flags & FLAG_NO_TEMP else temp / 10,
+               "" if flags & FLAG_NO_HUM else hum / 10,
+               flags)
+
+
+def main(argv):
+    if len(argv) < 2:
+        print(__doc__)
+        return 1
+
+    out = open(argv[2], "w", newline="") if len(argv) > 2 else sys.stdout
+    writer = csv.writer(out)
+    writer.writerow(["timestamp", "weight_g", "temp_c", "hum_pct", "flags"])
+    with open(argv[1], "rb") as data_file:
+        for row in decode(data_file):
+            writer.writerow(row)
+    if out is not sys.stdout:
+        out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,41 @@
+import machine, uos
+from utime import ticks_ms, ticks_diff
+from My_SDCard import My_SDCard
+
+# pomiar przepustowości karty SD w KB/s (zapis i odczyt pliku, surowy odczyt sektorów)
+# uruchomienie z komputera: mpremote run sd_benchmark.py
+
+SPI_ID = 1
+CS_PIN = 15
+FILE_DIR = "/sd/benchmark.tmp"
+FILE_KB = 64
+CHUNK = 4096
+
+
+def kb_per_s(size, t):
+    return size * 1000 // (max(ticks_diff(ticks_ms(), t), 1) * 1024)
+
+
+sd = My_SDCard(machine.SPI(SPI_ID), CS_PIN)
+if(not sd.mounted):
+    print("--Brak karty SD--")
+else:
+    print("--Zegar SPI: %d Hz--" % sd.sd.current_baudrate)
+    buf = bytearray(CHUNK)
+
+    t = ticks_ms()
+    f = open(FILE_DIR, "wb")
+    for i in range(FILE_KB * 1024 // CHUNK):
+        f.write(buf)
+    f.close()
+    print("--Zapis pliku: %d KB/s--" % kb_per_s(FILE_KB * 1024, t))
+
+    t = ticks_ms()
+    f = open(FILE_DIR, "rb")
+    while(f.readinto(buf)):
+        pass
+    f.close()
+    print("--Odczyt pliku: %d KB/s--" % kb_per_s(FILE_KB * 1024, t))
+    uos.remove(FILE_DIR)
+
+    print("--Odczyt sektorow: %d KB/s--" % sd.sd.benchmark())
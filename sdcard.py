@@ -18,9 +18,16 @@ Example usage on ESP8266:
     os.mount(sd, '/sd')
     os.listdir('/')
 
+The extended block protocol (offsets, ioctl 1-6) is implemented, so the
+card can also hold littlefs:
+
+    os.VfsLfs2.mkfs(sd)
+    os.mount(os.VfsLfs2(sd), '/sd')
+
 """
 
 from micropython import const
+import micropython
 import time
 
 
@@ -37,15 +44,51 @@ _TOKEN_CMD25 = const(0xFC)
 _TOKEN_STOP_TRAN = const(0xFD)
 _TOKEN_DATA = const(0xFE)
 
+# SPI clock rates tried after initialisation, fastest first
+_BAUDRATES = (20000000, 10000000, 5000000, 2500000, 1320000)
+
+
+def _crc16_table():
+    # CRC16-CCITT (polynomial 0x1021, initial value 0) as used for SD data blocks
+    table = bytearray(512)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1) & 0xFFFF
+        table[2 * i] = crc >> 8
+        table[2 * i + 1] = crc & 0xFF
+    return table
+
+
+_CRC16_TABLE = _crc16_table()
+
+
+@micropython.viper
+def _crc16(buf, n: int) -> int:
+    data = ptr8(buf)
+    table = ptr8(_CRC16_TABLE)
+    crc = 0
+    for i in range(n):
+        j = (((crc >> 8) ^ data[i]) & 0xFF) << 1
+        crc = ((crc << 8) ^ (table[j] << 8) ^ table[j + 1]) & 0xFFFF
+    return crc
+
 
 class SDCard:
-    def __init__(self, spi, cs):
+    def __init__(self, spi, cs, baudrate=0):
         self.spi = spi
         self.cs = cs
+        # 0: negotiate the fastest working rate from _BAUDRATES, otherwise a fixed rate
+        self.baudrate = baudrate
+        self.baud_index = 0
+        self.initialised = False
 
         self.cmdbuf = bytearray(6)
         self.dummybuf = bytearray(512)
         self.tokenbuf = bytearray(1)
+        self.crcbuf = bytearray(2)
+        self.busybuf = bytearray(8)
+        self.blockbuf = bytearray(512)
         for i in range(512):
             self.dummybuf[i] = 0xFF
         self.dummybuf_memoryview = memoryview(self.dummybuf)
@@ -54,6 +97,7 @@ class SDCard:
         # self.init_card()
 
     def init_spi(self, baudrate):
+        self.current_baudrate = baudrate
         try:
             master = self.spi.MASTER
         except AttributeError:
@@ -64,6 +108,7 @@ class SDCard:
             self.spi.init(master, baudrate=baudrate, phase=0, polarity=0)
 
     def init_card(self):
+        self.initialised = False
         # init CS pin
         self.cs.init(self.cs.OUT, value=1)
 
@@ -91,11 +136,7 @@ class SDCard:
             raise OSError("couldn't determine SD card version")
 
         # get the number of sectors
-        # CMD9: response R2 (R1 byte + 16-byte block read)
-        if self.cmd(9, 0, 0, 0, False) != 0:
-            raise OSError("no response from SD card")
-        csd = bytearray(16)
-        self.readinto(csd)
+        csd = self.read_csd()
         if csd[0] & 0xC0 == 0x40:  # CSD version 2.0
             self.sectors = ((csd[8] << 8 | csd[9]) + 1) * 1024
         elif csd[0] & 0xC0 == 0x00:  # CSD version 1.0 (old, <=2GB)
@@ -111,7 +152,42 @@ class SDCard:
             raise OSError("can't set 512 block size")
 
         # set to high data rate now that it's initialised
-        self.init_spi(1320000)
+        if self.baudrate:
+            self.init_spi(self.baudrate)
+        else:
+            self.negotiate_baudrate(csd)
+        self.initialised = True
+
+    def read_csd(self):
+        # CMD9: response R2 (R1 byte + 16-byte block read)
+        if self.cmd(9, 0, 0, 0, False) != 0:
+            raise OSError("no response from SD card")
+        csd = bytearray(16)
+        self.readinto(csd)
+        return csd
+
+    def negotiate_baudrate(self, csd, start=0):
+        # try rates from the fastest down; a rate is accepted when the CSD
+        # (which carries its own CRC7) reads back identical to the slow read
+        for i in range(start, len(_BAUDRATES)):
+            self.init_spi(_BAUDRATES[i])
+            try:
+                if self.read_csd() == csd:
+                    self.baud_index = i
+                    return _BAUDRATES[i]
+            except OSError:
+                pass
+        self.baud_index = len(_BAUDRATES) - 1
+        self.init_spi(_BAUDRATES[-1])
+        return _BAUDRATES[-1]
+
+    def fallback(self):
+        # drop to the next slower rate after a CRC or response error; False if already slowest
+        if self.baudrate or self.baud_index >= len(_BAUDRATES) - 1:
+            return False
+        self.baud_index += 1
+        self.init_spi(_BAUDRATES[self.baud_index])
+        return True
 
     def init_card_v1(self):
         for i in range(_CMD_TIMEOUT):
@@ -186,12 +262,14 @@ class SDCard:
             mv = mv[: len(buf)]
         self.spi.write_readinto(mv, buf)
 
-        # read checksum
-        self.spi.write(b"\xff")
-        self.spi.write(b"\xff")
+        # read checksum; a mismatch is reported like a response error so the
+        # caller retries at a slower clock rate
+        self.spi.readinto(self.crcbuf, 0xFF)
 
         self.cs(1)
         self.spi.write(b"\xff")
+        if (self.crcbuf[0] << 8 | self.crcbuf[1]) != _crc16(buf, len(buf)):
+            raise OSError(5)  # EIO
 
     def write(self, token, buf):
         self.cs(0)
@@ -203,30 +281,50 @@ class SDCard:
         self.spi.write(b"\xff")
 
         # check the response
-        if (self.spi.read(1, 0xFF)[0] & 0x1F) != 0x05:
+        self.spi.readinto(self.tokenbuf, 0xFF)
+        if (self.tokenbuf[0] & 0x1F) != 0x05:
             self.cs(1)
             self.spi.write(b"\xff")
-            return
+            raise OSError(5)  # EIO
 
         # wait for write to finish
-        while self.spi.read(1, 0xFF)[0] == 0:
-            pass
+        self.wait_busy()
 
         self.cs(1)
         self.spi.write(b"\xff")
 
+    def wait_busy(self):
+        # the card holds MISO low while busy; poll several bytes per transfer
+        # instead of one, the extra clocks after it becomes ready are ignored
+        buf = self.busybuf
+        self.spi.readinto(buf, 0xFF)
+        while buf[-1] == 0:
+            self.spi.readinto(buf, 0xFF)
+
     def write_token(self, token):
         self.cs(0)
         self.spi.read(1, token)
         self.spi.write(b"\xff")
         # wait for write to finish
-        while self.spi.read(1, 0xFF)[0] == 0x00:
-            pass
+        self.wait_busy()
 
         self.cs(1)
         self.spi.write(b"\xff")
 
-    def readblocks(self, block_num, buf):
+    def readblocks(self, block_num, buf, offset=0):
+        if offset or len(buf) % 512:
+            self._read_partial(block_num, buf, offset)
+            return
+        while True:
+            try:
+                self._readblocks(block_num, buf)
+                return
+            except OSError:
+                # CRC or response error: retry at the next slower clock rate
+                if not self.fallback():
+                    raise
+
+    def _readblocks(self, block_num, buf):
         nblocks = len(buf) // 512
         assert nblocks and not len(buf) % 512, "Buffer length is invalid"
         if nblocks == 1:
@@ -245,15 +343,64 @@ class SDCard:
                 raise OSError(5)  # EIO
             offset = 0
             mv = memoryview(buf)
-            while nblocks:
-                # receive the data and release card
-                self.readinto(mv[offset : offset + 512])
-                offset += 512
-                nblocks -= 1
+            try:
+                while nblocks:
+                    # receive the data and release card
+                    self.readinto(mv[offset : offset + 512])
+                    offset += 512
+                    nblocks -= 1
+            except OSError:
+                # stop the transmission before the caller retries
+                self.cmd(12, 0, 0xFF, skip1=True)
+                raise
             if self.cmd(12, 0, 0xFF, skip1=True):
                 raise OSError(5)  # EIO
 
-    def writeblocks(self, block_num, buf):
+    def writeblocks(self, block_num, buf, offset=0):
+        if offset or len(buf) % 512:
+            self._write_partial(block_num, buf, offset)
+            return
+        try:
+            self._writeblocks(block_num, buf)
+        except OSError:
+            # retry once at a slower clock rate
+            if not self.fallback():
+                raise
+            self._writeblocks(block_num, buf)
+
+    def _read_partial(self, block_num, buf, offset):
+        # extended interface: read len(buf) bytes starting offset bytes into block_num
+        block_num += offset // 512
+        offset %= 512
+        mv = memoryview(buf)
+        blockbuf = self.blockbuf
+        pos = 0
+        while pos < len(buf):
+            n = min(512 - offset, len(buf) - pos)
+            self.readblocks(block_num, blockbuf)
+            mv[pos : pos + n] = blockbuf[offset : offset + n]
+            pos += n
+            block_num += 1
+            offset = 0
+
+    def _write_partial(self, block_num, buf, offset):
+        # extended interface: read-modify-write of the blocks covered by buf
+        block_num += offset // 512
+        offset %= 512
+        mv = memoryview(buf)
+        blockbuf = self.blockbuf
+        pos = 0
+        while pos < len(buf):
+            n = min(512 - offset, len(buf) - pos)
+            if n < 512:
+                self.readblocks(block_num, blockbuf)
+            blockbuf[offset : offset + n] = mv[pos : pos + n]
+            self.writeblocks(block_num, blockbuf)
+            pos += n
+            block_num += 1
+            offset = 0
+
+    def _writeblocks(self, block_num, buf):
         nblocks, err = divmod(len(buf), 512)
         assert nblocks and not err, "Buffer length is invalid"
         if nblocks == 1:
@@ -264,19 +411,60 @@ class SDCard:
             # send the data
             self.write(_TOKEN_DATA, buf)
         else:
+            # ACMD23: pre-erase the blocks of the run (speeds up CMD25)
+            self.cmd(55, 0, 0)
+            self.cmd(23, nblocks, 0)
             # CMD25: set write address for first block
             if self.cmd(25, block_num * self.cdv, 0) != 0:
                 raise OSError(5)  # EIO
             # send the data
             offset = 0
             mv = memoryview(buf)
-            while nblocks:
-                self.write(_TOKEN_CMD25, mv[offset : offset + 512])
-                offset += 512
-                nblocks -= 1
-            self.write_token(_TOKEN_STOP_TRAN)
+            try:
+                while nblocks:
+                    self.write(_TOKEN_CMD25, mv[offset : offset + 512])
+                    offset += 512
+                    nblocks -= 1
+            finally:
+                self.write_token(_TOKEN_STOP_TRAN)
+
+    def erase(self, block_num, count=1):
+        # CMD32/CMD33: first and last block of the range, CMD38: erase it
+        if self.cmd(32, block_num * self.cdv, 0) != 0:
+            raise OSError(5)  # EIO
+        if self.cmd(33, (block_num + count - 1) * self.cdv, 0) != 0:
+            raise OSError(5)  # EIO
+        if self.cmd(38, 0, 0, release=False) != 0:
+            self.cs(1)
+            raise OSError(5)  # EIO
+        self.wait_busy()
+        self.cs(1)
+        self.spi.write(b"\xff")
 
     def ioctl(self, op, arg):
+        if op == 1:  # initialise; the VFS calls this on mount, skip if already done
+            if not self.initialised:
+                self.init_card()
+            return 0
+        if op == 2:  # deinitialise
+            self.initialised = False
+            return 0
+        if op == 3:  # sync; writes are not cached by the driver
+            return 0
         if op == 4:  # get number of blocks
             return self.sectors
-
+        if op == 5:  # get block size in bytes
+            return 512
+        if op == 6:  # erase a block, arg is the block number
+            self.erase(arg)
+            return 0
+
+    def benchmark(self, block_num=0, nblocks=64, chunk=8):
+        # read throughput in KB/s over nblocks starting at block_num (read-only,
+        # safe on a mounted card); see sd_benchmark.py for write throughput
+        buf = bytearray(chunk * 512)
+        t = time.ticks_ms()
+        for n in range(0, nblocks, chunk):
+            self.readblocks(block_num + n, buf)
+        dt = max(time.ticks_diff(time.ticks_ms(), t), 1)
+        return nblocks * 512 * 1000 // (dt * 1024)